@@ -0,0 +1,22 @@
+// SPDX-License-Identifier: MIT
+
+pragma solidity 0.6.12;
+pragma experimental ABIEncoderV2;
+
+import "../MyStrategy.sol";
+
+/**
+    @dev MyStrategy with a borrowDepth setter, for the gas benchmarks, not for production
+*/
+contract MyStrategyHarness is MyStrategy {
+    /**
+        @dev set the max number of leverage / deleverage rounds per action
+        @param _borrowDepth the number of rounds
+        @notice require 0 < _borrowDepth <= 255, _ReleaseBorrow counts the rounds in a uint8
+    */
+    function setBorrowDepth(uint256 _borrowDepth) external {
+        _onlyAuthorizedActors();
+        require(_borrowDepth > 0 && _borrowDepth <= type(uint8).max);
+        borrowDepth = _borrowDepth;
+    }
+}
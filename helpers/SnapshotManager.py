@@ -1,7 +1,10 @@
+import time
+
 from brownie import *
 from tabulate import tabulate
 from rich.console import Console
-from helpers.multicall import Multicall
+from helpers.multicall import Call, Multicall, CallPlan, func
+from helpers.multicall.multicall import block_number
 
 from helpers.utils import (
     val,
@@ -9,7 +12,14 @@ from helpers.utils import (
     difference,
 )
 
+from helpers.token_decimals import registry, DEFAULT_DECIMALS
 from helpers.snapshot.snap import Snap
+from helpers.snapshot.diff import diff_snaps
+from helpers.snapshot.history import SnapHistory
+from helpers.snapshot.store import SnapStore
+from helpers.snapshot.users import UserSnap
+from helpers.snapshot import metrics
+from helpers.gas_trace import session_profile
 
 from _setup.StrategyResolver import StrategyResolver
 
@@ -17,15 +27,48 @@ console = Console()
 
 
 class SnapshotManager:
-    def __init__(self, sett, strategy, key):
+    def __init__(
+        self,
+        sett,
+        strategy,
+        key,
+        maxSnaps=None,
+        spillPath=None,
+        storePath=None,
+        gasProfile=None,
+        sinks=None,
+    ):
+        """
+        maxSnaps bounds the snaps kept in memory, least recently used go first
+        spillPath keeps evicted snaps on disk so they can still be fetched
+        storePath appends every snap to a columnar SnapStore for offline analysis
+        gasProfile breaks the gas of every action down by function, the
+        session GasProfile when GAS_TRACE is set
+        sinks get the timing and RPC metrics of every snap, metrics.sinks by default
+        """
         self.key = key
         self.sett = sett
         self.strategy = strategy
         self.want = interface.IERC20Detailed(self.sett.token())
+        # Token behind every balances.<tokenKey> metric
+        self.tokens = {"want": self.want, "sett": self.sett}
+        # Decimals are fetched here once, so formatting never needs an RPC
+        registry.resolve(self.tokens.values())
         self.resolver = self.init_resolver(self.strategy.getName())
-        self.snaps = {}
+        self.snaps = SnapHistory(maxSnaps, spillPath)
+        self.store = SnapStore(storePath) if storePath else None
         self.settSnaps = {}
         self.entities = {}
+        # Compiled snap calls, keyed by the entity set they were built for
+        self.plans = {}
+        # (holders, CallPlan) of the last snapUsers
+        self.userPlan = None
+        self.sinks = sinks if sinks is not None else metrics.sinks
+        self.gasProfile = gasProfile if gasProfile is not None else session_profile()
+        if self.gasProfile is not None:
+            self.gasProfile.label(self.strategy.iToken(), "iToken")
+            self.gasProfile.label(self.strategy.comptroller(), "comptroller")
+            self.gasProfile.label(self.strategy.unirouter(), "router")
 
         assert self.want == self.strategy.want()
 
@@ -50,43 +93,191 @@ class SnapshotManager:
         calls = self.resolver.add_strategy_snap(calls, entities=entities)
         return calls
 
-    def snap(self, trackedUsers=None):
-        print("snap")
-        snapBlock = chain.height
-        entities = self.entities
-
+    def call_plan(self, entities):
+        """
+        Compiled CallPlan for this entity set, built on first use only
+        """
+        key = tuple(entities.items())
+        if key not in self.plans:
+            # One reverting view must not take down the whole snap
+            self.plans[key] = CallPlan(
+                self.add_snap_calls(entities), require_success=False
+            )
+        return self.plans[key]
+
+    def snap(self, trackedUsers=None, block_identifier=None):
+        """
+        Snapshots every tracked metric, at the latest block by default
+        Pass a historical block number, tag or hash as block_identifier to
+        read past state
+        """
+        started = time.perf_counter()
+        live = block_identifier in (None, "latest")
+        if block_identifier is None:
+            snapBlock = chain.height
+        else:
+            # Tags and hashes are resolved once, every chunk reads that number
+            snapBlock = block_number(block_identifier)
+            block_identifier = snapBlock
+        # Tracked users only belong to this snap, self.entities stays as is
+        entities = dict(self.entities)
         if trackedUsers:
-            for key, user in trackedUsers.items():
-                entities[key] = user
+            entities.update(trackedUsers)
 
-        calls = self.add_snap_calls(entities)
-        multi = Multicall(calls)
+        plan = self.call_plan(entities)
+        planTime = time.perf_counter() - started
+        multi = Multicall(plan, block_identifier=block_identifier)
         # multi.printCalls()
 
         data = multi()
-        self.snaps[snapBlock] = Snap(
+        if block_identifier is not None and multi.block != snapBlock:
+            raise Exception(
+                "Snap at block {} read block {}".format(snapBlock, multi.block)
+            )
+
+        snap = Snap(
             data,
             snapBlock,
             [x[0] for x in entities.items()],
+            aggregateBlock=multi.block,
+        )
+        self.snaps[snapBlock] = snap
+        if self.store is not None:
+            # A live snap at or before the last stored block follows a chain.revert()
+            self.store.append(snap, rewind=live)
+
+        self.emitMetrics("snap", snapBlock, multi, planTime, started)
+        return snap
+
+    def snapRange(self, blocks, trackedUsers=None):
+        """
+        Snapshots each historical block in blocks, one batched read per block
+        Blocks are snapped in ascending order, the order the store appends in
+        """
+        return [
+            self.snap(trackedUsers, block_identifier=block)
+            for block in sorted(set(blocks))
+        ]
+
+    def user_plan(self, users):
+        """
+        CallPlan reading want and sett balances of users, plus the sett PPFS
+        The last one is kept, snapshotting the same holder set again reuses it
+        """
+        key = tuple(users)
+        if self.userPlan is None or self.userPlan[0] != key:
+            calls = [
+                Call(
+                    self.sett.address,
+                    [func.sett.getPricePerFullShare],
+                    [["ppfs", None]],
+                ),
+                Call(
+                    self.sett.address,
+                    [func.erc20.totalSupply],
+                    [["totalSupply", None]],
+                ),
+            ]
+            for i, user in enumerate(users):
+                calls.append(
+                    Call(
+                        self.want.address,
+                        [func.erc20.balanceOf, user],
+                        [["want." + str(i), None]],
+                    )
+                )
+                calls.append(
+                    Call(
+                        self.sett.address,
+                        [func.erc20.balanceOf, user],
+                        [["shares." + str(i), None]],
+                    )
+                )
+            self.userPlan = (key, CallPlan(calls, require_success=False))
+        return self.userPlan[1]
+
+    def snapUsers(self, users, block_identifier=None):
+        """
+        Want balance, shares and their value for every user, in one chunked
+        multicall pass at a single block
+        users is a {key: address} dict or a list of addresses
+        """
+        if isinstance(users, dict):
+            keys, addresses = list(users.keys()), list(users.values())
+        else:
+            addresses = list(users)
+            keys = addresses
+        addresses = [getattr(user, "address", user) for user in addresses]
+
+        started = time.perf_counter()
+        plan = self.user_plan(addresses)
+        planTime = time.perf_counter() - started
+        multi = Multicall(plan, block_identifier=block_identifier)
+        data = multi()
+        self.emitMetrics("users", multi.block, multi, planTime, started)
+        return UserSnap(
+            addresses,
+            keys,
+            [data["want." + str(i)] for i in range(len(addresses))],
+            [data["shares." + str(i)] for i in range(len(addresses))],
+            multi.block,
+            data["ppfs"],
+            data["totalSupply"],
+            registry.get(self.sett),
         )
 
-        return self.snaps[snapBlock]
+    def emitMetrics(self, kind, block, multi, planTime, started):
+        if not self.sinks:
+            return
+        snapMetrics = metrics.snap_metrics(
+            kind, self.key, block, multi, planTime, time.perf_counter() - started
+        )
+        for sink in self.sinks:
+            sink.emit(snapMetrics)
+
+    def getSnap(self, block):
+        """
+        Snap taken at block, read back from disk if it was evicted
+        """
+        return self.snaps[block]
 
     def addEntity(self, key, entity):
         self.entities[key] = entity
+        # Compiled plans no longer cover every entity
+        self.plans = {}
 
     def init_resolver(self, name):
         print("init_resolver", name)
         return StrategyResolver(self)
 
+    def requireReadable(self, *snaps):
+        """
+        Raises if a call behind any of snaps failed, resolvers do arithmetic
+        on every value they read and can't handle a CALL_FAILED
+        """
+        for snap in snaps:
+            failed = snap.failed()
+            if failed:
+                raise Exception(
+                    "Snap at block {} has failed calls: {}".format(
+                        snap.block, ", ".join(failed)
+                    )
+                )
+
+    def profileGas(self, action, tx):
+        if self.gasProfile is not None:
+            self.gasProfile.record(action, tx)
+
     def settTend(self, trackuser, overrides, confirm=True):
         # user = overrides["from"].address
         user = trackuser
         trackedUsers = {"user": user}
         before = self.snap(trackedUsers)
         tx = self.strategy.tend(overrides)
+        self.profileGas("tend", tx)
         after = self.snap(trackedUsers)
         if confirm:
+            self.requireReadable(before, after)
             self.resolver.confirm_tend(before, after, tx)
 
     def settHarvest(self, trackuser, overrides, confirm=True):
@@ -95,18 +286,22 @@ class SnapshotManager:
         trackedUsers = {"user": user}
         before = self.snap(trackedUsers)
         tx = self.strategy.harvest(overrides)
+        self.profileGas("harvest", tx)
         after = self.snap(trackedUsers)
         if confirm:
+            self.requireReadable(before, after)
             self.resolver.confirm_harvest(before, after, tx)
 
     def settDeposit(self, amount, overrides, confirm=True):
         user = overrides["from"].address
         trackedUsers = {"user": user}
         before = self.snap(trackedUsers)
-        self.sett.deposit(amount, overrides)
+        tx = self.sett.deposit(amount, overrides)
+        self.profileGas("deposit", tx)
         after = self.snap(trackedUsers)
 
         if confirm:
+            self.requireReadable(before, after)
             self.resolver.confirm_deposit(
                 before, after, {"user": user, "amount": amount}
             )
@@ -116,9 +311,11 @@ class SnapshotManager:
         trackedUsers = {"user": user}
         userBalance = self.want.balanceOf(user)
         before = self.snap(trackedUsers)
-        self.sett.depositAll(overrides)
+        tx = self.sett.depositAll(overrides)
+        self.profileGas("deposit", tx)
         after = self.snap(trackedUsers)
         if confirm:
+            self.requireReadable(before, after)
             self.resolver.confirm_deposit(
                 before, after, {"user": user, "amount": userBalance}
             )
@@ -129,9 +326,11 @@ class SnapshotManager:
         user = trackuser
         trackedUsers = {"user": user}
         before = self.snap(trackedUsers)
-        self.sett.earn(overrides)
+        tx = self.sett.earn(overrides)
+        self.profileGas("earn", tx)
         after = self.snap(trackedUsers)
         if confirm:
+            self.requireReadable(before, after)
             self.resolver.confirm_earn(before, after, {"user": user})
 
     def settWithdraw(self, amount, overrides, confirm=True):
@@ -140,8 +339,10 @@ class SnapshotManager:
         before = self.snap(trackedUsers)
 
         tx = self.sett.withdraw(amount, overrides)
+        self.profileGas("withdraw", tx)
         after = self.snap(trackedUsers)
         if confirm:
+            self.requireReadable(before, after)
             self.resolver.confirm_withdraw(
                 before, after, {"user": user, "amount": amount}, tx
             )
@@ -153,8 +354,10 @@ class SnapshotManager:
         before = self.snap(trackedUsers)
 
         tx = self.sett.withdraw(userBalance, overrides)
+        self.profileGas("withdraw", tx)
         after = self.snap(trackedUsers)
         if confirm:
+            self.requireReadable(before, after)
             self.resolver.confirm_withdraw(
                 before, after, {"user": user, "amount": userBalance}, tx
             )
@@ -175,8 +378,10 @@ class SnapshotManager:
         before = self.snap(trackedUsers)
 
         tx = self.sett.withdraw(userBalance, overrides)
+        self.profileGas("withdraw", tx)
         after = self.snap(trackedUsers)
         if confirm:
+            self.requireReadable(before, after)
             self.resolver.confirm_withdraw(
                 before, after, {"user": user, "amount": userBalance}, tx
             )
@@ -184,19 +389,29 @@ class SnapshotManager:
     # withdraw all will induce large slippage when the treasury sett balance is very small
     # so we set to test withdraw 98% balance here
 
+    def decimals(self, key):
+        """
+        Decimals a metric is scaled by, None for metrics that aren't amounts
+        """
+        if "stakingRewards.staked" in key or "stakingRewards.earned" in key:
+            return DEFAULT_DECIMALS
+        if key.startswith("balances."):
+            # balances.<tokenKey>.<entityKey>
+            token = self.tokens.get(key.split(".")[1])
+            return registry.get(token) if token else DEFAULT_DECIMALS
+        # PPFS is scaled by the sett's decimals, see shares_math.from_shares_to_want
+        if key in ("sett.totalSupply", "sett.getPricePerFullShare"):
+            return registry.get(self.sett)
+        if "balance" in key or "Position" in key or key == "sett.available":
+            # Sett and strategy balances and positions are in want
+            return registry.get(self.want)
+        return None
+
     def format(self, key, value):
         if type(value) is int:
-            if "stakingRewards.staked" or "stakingRewards.earned" in key:
-                return val(value)
-            # Ether-scaled balances
-            # TODO: Handle based on token decimals
-            if (
-                "balance" in key
-                or key == "sett.available"
-                or key == "sett.getPricePerFullShare"
-                or key == "sett.totalSupply"
-            ):
-                return val(value)
+            decimals = self.decimals(key)
+            if decimals is not None:
+                return val(value, decimals)
         return value
 
     def diff(self, a, b):
@@ -205,7 +420,21 @@ class SnapshotManager:
         else:
             return "-"
 
-    def printCompare(self, before: Snap, after: Snap):
+    def compare(
+        self, before: Snap, after: Snap, keys=None, threshold=None, relativeBps=None
+    ):
+        """
+        SnapDiff of every changed metric, see SnapDiff.filter for the options
+        """
+        changes = diff_snaps(before, after)
+        if keys is not None or threshold is not None or relativeBps is not None:
+            changes = changes.filter(keys, threshold, relativeBps)
+        return changes
+
+    def compareJson(self, before: Snap, after: Snap, **filters):
+        return self.compare(before, after, **filters).to_json()
+
+    def printCompare(self, before: Snap, after: Snap, **filters):
         # self.printPermissions()
         table = []
         console.print(
@@ -214,21 +443,20 @@ class SnapshotManager:
             )
         )
 
-        for key, item in before.data.items():
-
-            a = item
-            b = after.get(key)
-
-            # Don't add items that don't change
-            if a != b:
-                table.append(
-                    [
-                        key,
-                        self.format(key, a),
-                        self.format(key, b),
-                        self.format(key, self.diff(a, b)),
-                    ]
-                )
+        # Only changed items are in the diff
+        changes = self.compare(before, after, **filters)
+        if not filters:
+            # Unfiltered output stays the key by key scan of before
+            changes = changes.filter(keys=before.has)
+        for key, a, b, change in changes:
+            table.append(
+                [
+                    key,
+                    self.format(key, a),
+                    self.format(key, b),
+                    self.format(key, change if change is not None else "-"),
+                ]
+            )
 
         print(
             tabulate(
@@ -271,7 +499,7 @@ class SnapshotManager:
         table = []
         console.print("[green]=== Status Report: {} Sett ===[green]".format(self.key))
 
-        for key, item in snap.data.items():
+        for key, item in snap.items():
             # Don't display 0 balances:
             if "balances" in key and item == 0:
                 continue
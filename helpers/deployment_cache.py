@@ -0,0 +1,76 @@
+import hashlib
+import json
+import os
+
+from brownie import web3
+
+"""
+  On-disk record of a test deployment, keyed by a hash of what it was built from
+
+  The deployed fixture deploys once per session. The chain it left behind
+  only survives the run on a node that outlives it (a ganache started by
+  hand rather than by brownie). To pick that deployment up again, the cache
+  keeps its addresses and the block the setup ended at. The entry is only
+  reused while that block is still the head, with the same hash, and every
+  address has code; anything else means the chain moved on and the setup
+  runs again.
+"""
+
+
+def config_hash(*parts):
+    """
+    Short sha256 of the parts (bytecode, addresses, fees, network, ...)
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode())
+        # Separator, ("ab", "c") and ("a", "bc") hash differently
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+
+class DeploymentCache:
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.entries = json.load(f)
+
+    def head(self):
+        block = web3.eth.get_block("latest")
+        return block["number"], block["hash"].hex()
+
+    def get(self, key):
+        """
+        Addresses of the cached deployment for key, None unless the chain
+        still sits at the block the deployment ended at
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if list(self.head()) != [entry["block"], entry["blockHash"]]:
+            return None
+        for address in entry["addresses"].values():
+            if len(web3.eth.get_code(address)) == 0:
+                return None
+        return entry["addresses"]
+
+    def save(self, key, addresses):
+        """
+        Records addresses as the deployment for key, at the current head
+        """
+        block, blockHash = self.head()
+        self.entries[key] = {
+            "block": block,
+            "blockHash": blockHash,
+            "addresses": dict(addresses),
+        }
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Written aside then moved, a crash never leaves half a cache
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.entries, f, indent=2)
+        os.replace(tmp, self.path)
@@ -0,0 +1,157 @@
+import numpy as np
+from dotmap import DotMap
+
+from helpers.shares_math import (
+    MAX_BPS,
+    SECS_PER_YEAR,
+    as_uint_arrays,
+    get_report_fees,
+)
+from _setup.config import (
+    PERFORMANCE_FEE_GOVERNANCE,
+    PERFORMANCE_FEE_STRATEGIST,
+    MANAGEMENT_FEE,
+)
+
+"""
+  Multi-harvest fee accrual simulator, built on get_report_fees
+
+  Every configuration is one element of a broadcast array, so a whole grid of
+  harvest cadences and fee settings runs in one pass, e.g.
+
+    simulate_harvests(
+        harvest_interval=[[days(0.25)], [days(1)], [days(7)]],
+        apr_bps=250,
+        duration=days(180),
+        vault_decimals=registry.get(vault),
+        performance_fee_treasury=[500, 1_000, 2_000],
+    )
+
+  Model:
+  - Between harvests the strategy earns simple interest on the vault balance
+  - A harvest reports that gain, get_report_fees mints the fee shares, and
+    the gain joins the balance, so it compounds from then on
+  - Harvests land on the first step at or after harvest_interval
+  All amounts stay exact Python ints with Solidity floor division.
+"""
+
+HOUR = 3_600
+
+
+def simulate_harvests(
+    harvest_interval,
+    apr_bps,
+    duration,
+    vault_decimals,
+    step=HOUR,
+    performance_fee_treasury=PERFORMANCE_FEE_GOVERNANCE,
+    performance_fee_strategist=PERFORMANCE_FEE_STRATEGIST,
+    management_fee=MANAGEMENT_FEE,
+    initial_balance=10 ** 8,
+    record_every=None,
+):
+    """
+    Simulates duration seconds of harvests for every broadcast configuration
+
+    harvest_interval, duration and step are in seconds
+    vault_decimals scales PPFS like vault.getPricePerFullShare()
+    record_every, in steps, records PPFS and totalSupply paths on the way
+
+    Returns a DotMap of arrays shaped like the broadcast configuration:
+    balance, total_supply, ppfs, treasury_shares, strategist_shares,
+    harvests and dilution_bps (fee shares over total supply), plus
+    times / ppfs_path / total_supply_path when recording
+    """
+    (
+        interval,
+        apr,
+        perf_treasury,
+        perf_strategist,
+        management,
+        balance,
+    ) = as_uint_arrays(
+        harvest_interval,
+        apr_bps,
+        performance_fee_treasury,
+        performance_fee_strategist,
+        management_fee,
+        initial_balance,
+    )
+    assert (interval > 0).all(), "harvest_interval must be positive"
+
+    one = 10 ** vault_decimals
+
+    # First deposit mints shares 1:1
+    supply = balance.copy()
+    zeros = np.zeros(balance.shape, dtype=object)
+    treasury = zeros.copy()
+    strategist = zeros.copy()
+    harvests = zeros.copy()
+    last = zeros.copy()
+
+    # Harvests happen on the step grid
+    interval = -(-interval // step) * step
+    record = record_every * step if record_every else None
+
+    times = []
+    ppfs_path = []
+    supply_path = []
+
+    t = 0
+    while True:
+        candidates = [int(np.min(last + interval))]
+        if record:
+            candidates.append((t // record + 1) * record)
+        t = min(candidates)
+        if t > duration:
+            break
+
+        since = t - last
+        gain = balance * apr * since // SECS_PER_YEAR // MAX_BPS
+        harvesting = np.asarray(since >= interval)
+        if harvesting.any():
+            fees = get_report_fees(
+                gain,
+                perf_treasury,
+                perf_strategist,
+                management,
+                since,
+                # get_report_fees adds to the supply in place
+                supply.copy(),
+                balance,
+            )
+            to_treasury = fees.shares_perf_treasury + fees.shares_management
+            to_strategist = fees.shares_perf_strategist
+
+            supply = np.where(harvesting, supply + to_treasury + to_strategist, supply)
+            treasury = np.where(harvesting, treasury + to_treasury, treasury)
+            strategist = np.where(harvesting, strategist + to_strategist, strategist)
+            balance = np.where(harvesting, balance + gain, balance)
+            gain = np.where(harvesting, 0, gain)
+            last = np.where(harvesting, t, last)
+            harvests = harvests + harvesting
+
+        if record and t % record == 0:
+            times.append(t)
+            # Unharvested gain is already in the vault balance() through the strategy
+            ppfs_path.append((balance + gain) * one // supply)
+            supply_path.append(supply.copy())
+
+    # Value at the end of the run, including gain not harvested yet
+    since = duration - last
+    gain = balance * apr * since // SECS_PER_YEAR // MAX_BPS
+
+    result = DotMap(
+        balance=balance,
+        total_supply=supply,
+        ppfs=(balance + gain) * one // supply,
+        treasury_shares=treasury,
+        strategist_shares=strategist,
+        harvests=harvests,
+        dilution_bps=(treasury + strategist) * MAX_BPS // supply,
+    )
+    if record:
+        result.times = np.array(times, dtype=object)
+        result.ppfs_path = np.array(ppfs_path, dtype=object)
+        result.total_supply_path = np.array(supply_path, dtype=object)
+    return result
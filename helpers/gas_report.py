@@ -0,0 +1,105 @@
+import csv
+import json
+import os
+
+"""
+  Gas used per strategy action, written as JSON / CSV and checked against a baseline
+
+  Every entry is an action (deposit, earn, harvest, ...), the parameters of
+  the run it belongs to and the tx gas_used. Entries with the same action and
+  parameters are matched between a run and the baseline.
+"""
+
+# Allowed gas increase over the baseline before it counts as a regression
+TOLERANCE_BPS = 200
+
+
+def entry_key(action, params):
+    return (
+        action
+        + "|"
+        + ",".join("{}={}".format(name, params[name]) for name in sorted(params))
+    )
+
+
+class GasReport:
+    def __init__(self):
+        self.entries = {}
+
+    def record(self, action, params, tx):
+        """
+        Records tx.gas_used (or a plain int) for action under params
+        """
+        gas = getattr(tx, "gas_used", tx)
+        self.entries[entry_key(action, params)] = {
+            "action": action,
+            "params": dict(params),
+            "gas": gas,
+        }
+        return gas
+
+    def __len__(self):
+        return len(self.entries)
+
+    def merge(self, entries):
+        """
+        Adds the entries of another report, e.g. from an xdist worker
+        """
+        self.entries.update(entries)
+
+    # ===== Output =====
+
+    def to_json(self, path):
+        with open(path, "w") as f:
+            json.dump(
+                {"entries": [self.entries[key] for key in sorted(self.entries)]},
+                f,
+                indent=2,
+            )
+
+    def to_csv(self, path):
+        names = sorted(
+            {name for entry in self.entries.values() for name in entry["params"]}
+        )
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["action"] + names + ["gas"])
+            for key in sorted(self.entries):
+                entry = self.entries[key]
+                writer.writerow(
+                    [entry["action"]]
+                    + [entry["params"].get(name, "") for name in names]
+                    + [entry["gas"]]
+                )
+
+    def write(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self.to_json(os.path.join(directory, "gas.json"))
+        self.to_csv(os.path.join(directory, "gas.csv"))
+
+    # ===== Baseline =====
+
+    @classmethod
+    def load(cls, path):
+        report = cls()
+        with open(path) as f:
+            for entry in json.load(f)["entries"]:
+                report.entries[entry_key(entry["action"], entry["params"])] = entry
+        return report
+
+    def compare(self, baseline, tolerance_bps=TOLERANCE_BPS):
+        """
+        Entries using more than tolerance_bps over their baseline entry, as
+        (key, baseline gas, gas, change in bps)
+        Entries missing from the baseline are not regressions
+        """
+        regressions = []
+        for key in sorted(self.entries):
+            if key not in baseline.entries:
+                continue
+            before = baseline.entries[key]["gas"]
+            after = self.entries[key]["gas"]
+            change = (after - before) * 10_000 // before if before else 0
+            if change > tolerance_bps:
+                regressions.append((key, before, after, change))
+        return regressions
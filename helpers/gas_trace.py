@@ -0,0 +1,185 @@
+import json
+import os
+
+from tabulate import tabulate
+
+"""
+  Gas of SnapshotManager actions broken down by function, from tx traces
+
+  Every step of a brownie trace carries the function it runs in (fn), its call
+  depth and its internal jump depth. Steps are folded into function frames,
+  a frame's gas is the gas left at its first step minus the gas left after its
+  last one, so it includes everything it called (inclusive) and self is what
+  remains once its children are taken out.
+  Calls into labelled addresses (iToken, comptroller, router) are named after
+  the label, e.g. "iToken.mint", whatever the contract is on the fork.
+
+    profile = GasProfile()
+    profile.label(strategy.iToken(), "iToken")
+    profile.record("harvest", strategy.harvest({"from": keeper}))
+    profile.print()
+
+  Set GAS_TRACE=1 to have every SnapshotManager record into session, printed
+  at the end of the pytest session.
+"""
+
+# Strategy internals the leverage loop spends its gas in
+FOCUS = ("_Leverage", "_Deleverage", "swapComp", "predictCompAccrued")
+
+
+def frame_name(step, labels):
+    address = step.get("address")
+    if address in labels:
+        return labels[address] + "." + step["fn"].split(".")[-1]
+    return step["fn"]
+
+
+def attribute(trace, labels=None):
+    """
+    {name: [calls, gas, self gas]} of every function frame in trace
+    """
+    labels = labels or {}
+    totals = {}
+    # [level, name, gas left at first step, gas of children]
+    stack = []
+
+    def close(frame, gasLeft):
+        level, name, startGas, childGas = frame
+        gas = startGas - gasLeft
+        total = totals.setdefault(name, [0, 0, 0])
+        total[0] += 1
+        total[1] += gas
+        total[2] += gas - childGas
+        if stack:
+            stack[-1][3] += gas
+
+    previous = None
+    for step in trace:
+        level = (step["depth"], step["jumpDepth"])
+        name = frame_name(step, labels)
+        while stack and (
+            stack[-1][0] > level or (stack[-1][0] == level and stack[-1][1] != name)
+        ):
+            close(stack.pop(), previous["gas"] - previous["gasCost"])
+        if not stack or stack[-1][0] < level:
+            stack.append([level, name, step["gas"], 0])
+        previous = step
+    while stack:
+        close(stack.pop(), previous["gas"] - previous["gasCost"])
+    return totals
+
+
+def short_name(name):
+    return name.split(".")[-1]
+
+
+class GasProfile:
+    def __init__(self):
+        self.labels = {}
+        # {action: {name: [calls, gas, self gas]}}
+        self.actions = {}
+        # {action: [txs, gas_used]}
+        self.txs = {}
+
+    def __len__(self):
+        return sum(txs for txs, _ in self.txs.values())
+
+    def label(self, address, name):
+        self.labels[str(getattr(address, "address", address))] = name
+
+    def record(self, action, tx):
+        """
+        Adds the function breakdown of tx to action
+        Fetches the trace, debug_traceTransaction must be available
+        """
+        txs = self.txs.setdefault(action, [0, 0])
+        txs[0] += 1
+        txs[1] += tx.gas_used
+        totals = self.actions.setdefault(action, {})
+        for name, (calls, gas, selfGas) in attribute(tx.trace, self.labels).items():
+            total = totals.setdefault(name, [0, 0, 0])
+            total[0] += calls
+            total[1] += gas
+            total[2] += selfGas
+
+    def state(self):
+        return {"labels": self.labels, "actions": self.actions, "txs": self.txs}
+
+    def merge(self, state):
+        """
+        Adds the state() of another profile, e.g. from an xdist worker
+        """
+        self.labels.update(state["labels"])
+        for action, (txs, gasUsed) in state["txs"].items():
+            total = self.txs.setdefault(action, [0, 0])
+            total[0] += txs
+            total[1] += gasUsed
+        for action, totals in state["actions"].items():
+            current = self.actions.setdefault(action, {})
+            for name, values in totals.items():
+                total = current.setdefault(name, [0, 0, 0])
+                for i, value in enumerate(values):
+                    total[i] += value
+
+    # ===== Report =====
+
+    def focused(self, name):
+        return short_name(name) in FOCUS or name.split(".")[0] in self.labels.values()
+
+    def rows(self, action=None, focus=False):
+        """
+        (action, name, calls, gas, self gas, share of the action's gas_used in bps)
+        Heaviest first, focus keeps FOCUS functions and labelled calls only
+        """
+        rows = []
+        for current, totals in self.actions.items():
+            if action is not None and current != action:
+                continue
+            used = self.txs[current][1]
+            for name, (calls, gas, selfGas) in totals.items():
+                if focus and not self.focused(name):
+                    continue
+                share = gas * 10_000 // used if used else 0
+                rows.append((current, name, calls, gas, selfGas, share))
+        return sorted(rows, key=lambda row: (row[0], -row[3]))
+
+    def print(self, action=None, focus=True):
+        print(
+            tabulate(
+                [
+                    [current, name, calls, gas, selfGas, share / 100]
+                    for current, name, calls, gas, selfGas, share in self.rows(
+                        action, focus
+                    )
+                ],
+                headers=["action", "function", "calls", "gas", "self", "% of tx"],
+                tablefmt="grid",
+            )
+        )
+
+    def to_json(self, path):
+        with open(path, "w") as f:
+            json.dump(
+                {
+                    "txs": self.txs,
+                    "functions": [
+                        dict(
+                            zip(
+                                ["action", "function", "calls", "gas", "self", "bps"],
+                                row,
+                            )
+                        )
+                        for row in self.rows()
+                    ],
+                },
+                f,
+                indent=2,
+            )
+
+
+# Shared by every SnapshotManager of a session when GAS_TRACE is set
+session = GasProfile()
+
+
+def session_profile():
+    return session if os.environ.get("GAS_TRACE") else None
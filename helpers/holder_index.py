@@ -0,0 +1,173 @@
+import json
+import os
+
+from brownie import web3
+
+from helpers.multicall.call import checksum_address
+
+"""
+  Holder -> balance index of ERC20 tokens, built from Transfer logs
+
+  HolderIndex pulls Transfer events with eth_getLogs over adaptive block
+  ranges: a range the node refuses (too many results, timeouts) is split in
+  half, and the range grows again after every successful request.
+  Balances and the last indexed block of every token are checkpointed to a
+  JSON file after each range, so update() resumes where it stopped.
+
+    index = HolderIndex("holders.json", [sett, want], start_block=deployBlock)
+    index.update()
+    manager.snapUsers(index.holders(sett))
+"""
+
+TRANSFER_TOPIC = "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef"
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+INITIAL_SPAN = 10_000
+MAX_SPAN = 1_000_000
+
+
+def to_bytes(value):
+    if isinstance(value, str):
+        return bytes.fromhex(value[2:] if value.startswith("0x") else value)
+    return bytes(value)
+
+
+def decode_transfer(log):
+    """
+    (from, to, value) of a Transfer log
+    """
+    topics = log["topics"]
+    sender = checksum_address(to_bytes(topics[1])[-20:])
+    receiver = checksum_address(to_bytes(topics[2])[-20:])
+    return sender, receiver, int.from_bytes(to_bytes(log["data"]), "big")
+
+
+def adaptive_ranges(from_block, to_block, fetch, span=INITIAL_SPAN):
+    """
+    Yields (start, end, result) covering [from_block, to_block] in order, with
+    result = fetch(start, end)
+    A range fetch raises on is split in half, a single block that still fails
+    is raised
+    """
+    start = from_block
+    while start <= to_block:
+        end = min(start + span - 1, to_block)
+        try:
+            result = fetch(start, end)
+        except (ValueError, IOError):
+            if end == start:
+                raise
+            span = max(1, (end - start + 1) // 2)
+            continue
+        yield start, end, result
+        start = end + 1
+        span = min(span * 2, MAX_SPAN)
+
+
+class HolderIndex:
+    def __init__(self, path, tokens, start_block=0, confirmations=0, get_logs=None):
+        """
+        path: JSON checkpoint, loaded if it exists
+        tokens: contracts or addresses to index
+        start_block: first block to scan, e.g. the token's deployment block
+        confirmations: blocks behind the head left unindexed, for reorgs
+        """
+        self.path = path
+        self.confirmations = confirmations
+        self.get_logs = get_logs or web3.eth.get_logs
+        self.tokens = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                for token, entry in json.load(f)["tokens"].items():
+                    self.tokens[token] = {
+                        "lastBlock": entry["lastBlock"],
+                        "balances": {
+                            holder: int(balance)
+                            for holder, balance in entry["balances"].items()
+                        },
+                    }
+        for token in tokens:
+            token = checksum_address(getattr(token, "address", token))
+            if token not in self.tokens:
+                self.tokens[token] = {"lastBlock": start_block - 1, "balances": {}}
+
+    # ===== Checkpoint =====
+
+    def checkpoint(self):
+        data = {
+            "tokens": {
+                token: {
+                    "lastBlock": entry["lastBlock"],
+                    # Balances can outgrow JSON number precision in other readers
+                    "balances": {
+                        holder: str(balance)
+                        for holder, balance in entry["balances"].items()
+                    },
+                }
+                for token, entry in self.tokens.items()
+            }
+        }
+        # Written aside then moved, a crash never leaves half a checkpoint
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.path)
+
+    # ===== Indexing =====
+
+    def apply(self, token, logs):
+        balances = self.tokens[token]["balances"]
+        for log in logs:
+            sender, receiver, value = decode_transfer(log)
+            # Mints and burns move from and to the zero address
+            for holder, change in ((sender, -value), (receiver, value)):
+                if holder == ZERO_ADDRESS:
+                    continue
+                balance = balances.get(holder, 0) + change
+                if balance:
+                    balances[holder] = balance
+                else:
+                    balances.pop(holder, None)
+
+    def update(self, to_block=None):
+        """
+        Indexes every token up to to_block, the head minus confirmations by default
+        Returns the block indexed up to
+        """
+        if to_block is None:
+            to_block = web3.eth.block_number - self.confirmations
+        for token, entry in self.tokens.items():
+
+            def fetch(start, end):
+                return self.get_logs(
+                    {
+                        "address": token,
+                        "fromBlock": start,
+                        "toBlock": end,
+                        "topics": [TRANSFER_TOPIC],
+                    }
+                )
+
+            for start, end, logs in adaptive_ranges(
+                entry["lastBlock"] + 1, to_block, fetch
+            ):
+                self.apply(token, logs)
+                entry["lastBlock"] = end
+                self.checkpoint()
+        return to_block
+
+    # ===== Queries =====
+
+    def balances(self, token):
+        return dict(
+            self.tokens[checksum_address(getattr(token, "address", token))]["balances"]
+        )
+
+    def holders(self, token, min_balance=1):
+        """
+        Addresses holding at least min_balance of token, largest first
+        """
+        balances = self.balances(token)
+        return sorted(
+            (holder for holder, balance in balances.items() if balance >= min_balance),
+            key=lambda holder: -balances[holder],
+        )
@@ -0,0 +1,341 @@
+import numpy as np
+from dotmap import DotMap
+
+from helpers.shares_math import as_uint_array, as_uint_arrays
+
+"""
+  Integer-exact Python port of the MyStrategy leverage loops
+
+  Mirrors _IncreaseBorrow / _Leverage / _ReleaseBorrow / _Deleverage, the
+  borrowPositionNeedto* helpers and the _deposit / _withdrawSome /
+  _withdrawAll entry points, so collateralTarget, borrowDepth and minWant
+  can be tuned without a fork.
+
+  Every parameter broadcasts, one array element per configuration:
+
+    model = LeverageModel(
+        collateral_factor=75 * 10 ** 16,
+        collateral_target=[[60 * 10 ** 16], [68 * 10 ** 16], [72 * 10 ** 16]],
+        borrow_depth=[3, 5, 8],
+    )
+    model.deposit(10 ** 8)
+    model.result().supplys
+
+  The iToken side follows Compound: mint and redeemUnderlying convert at
+  exchange_rate with truncation, and there is no interest accrual within
+  a call. Anything that would revert on chain (SafeMath underflow of the
+  sub(10) guards, a comptroller shortfall, redeeming more than is held)
+  sets reverted and freezes that configuration.
+"""
+
+ONE = 10 ** 18
+## Compound initial exchange rate for an 8 decimals underlying, i.e. WBTC
+EXCHANGE_RATE = 2 * 10 ** 16
+## MyStrategy.initialize defaults for WBTC
+COLLATERAL_TARGET = 68 * 10 ** 16
+BORROW_DEPTH = 5
+MIN_WANT = 10 ** 8 // 10 ** 5
+## Rounding guard subtracted from every position change
+POSITION_GUARD = 10
+
+
+class LeverageModel:
+    def __init__(
+        self,
+        collateral_factor,
+        collateral_target=COLLATERAL_TARGET,
+        borrow_depth=BORROW_DEPTH,
+        min_want=MIN_WANT,
+        exchange_rate=EXCHANGE_RATE,
+        want=0,
+        supplys=0,
+        borrows=0,
+    ):
+        (
+            self.collateral_factor,
+            self.collateral_target,
+            self.borrow_depth,
+            self.min_want,
+            self.exchange_rate,
+            self.want,
+            supplys,
+            self.borrows,
+        ) = as_uint_arrays(
+            collateral_factor,
+            collateral_target,
+            borrow_depth,
+            min_want,
+            exchange_rate,
+            want,
+            supplys,
+            borrows,
+        )
+        ## Configurations are kept flat and reshaped on the way out
+        self.shape = self.want.shape
+        for name in (
+            "collateral_factor",
+            "collateral_target",
+            "borrow_depth",
+            "min_want",
+            "exchange_rate",
+            "want",
+            "borrows",
+        ):
+            setattr(self, name, getattr(self, name).reshape(-1))
+        supplys = supplys.reshape(-1)
+        self.itokens = supplys * ONE // self.exchange_rate
+        self.debt = self.zeros()
+        self.reverted = np.zeros(self.want.shape, dtype=bool)
+        self.not_all = np.zeros(self.want.shape, dtype=bool)
+
+        ## Call counts, what the gas cost of a leverage change scales with
+        self.rounds = self.zeros()
+        self.mints = self.zeros()
+        self.borrow_calls = self.zeros()
+        self.redeems = self.zeros()
+        self.repays = self.zeros()
+
+    def zeros(self):
+        return np.zeros(self.want.shape, dtype=object)
+
+    def uint(self, value):
+        value = np.broadcast_to(as_uint_array(value), self.shape)
+        return np.array(value, dtype=object).reshape(-1)
+
+    def shaped(self, values):
+        return np.array(values).reshape(self.shape)
+
+    def live(self, mask=True):
+        return np.asarray(mask) & ~self.reverted
+
+    def revert(self, mask):
+        self.reverted |= self.live(mask)
+
+    # ===== Positions =====
+
+    def get_current_position(self):
+        """
+        (supplys, borrows) like MyStrategy.getCurrentPosition
+        """
+        return self.itokens * self.exchange_rate // ONE, self.borrows.copy()
+
+    def result(self):
+        supplys, borrows = self.get_current_position()
+        return DotMap(
+            want=self.shaped(self.want),
+            supplys=self.shaped(supplys),
+            borrows=self.shaped(borrows),
+            net=self.shaped(self.want + supplys - borrows),
+            debt=self.shaped(self.debt),
+            reverted=self.shaped(self.reverted),
+            not_all=self.shaped(self.not_all),
+            rounds=self.shaped(self.rounds),
+            mints=self.shaped(self.mints),
+            borrow_calls=self.shaped(self.borrow_calls),
+            redeems=self.shaped(self.redeems),
+            repays=self.shaped(self.repays),
+        )
+
+    # ===== iToken =====
+
+    def mint(self, amount, mask):
+        mask = self.live(mask)
+        self.revert(mask & (amount > self.want))
+        mask = self.live(mask)
+        self.want = np.where(mask, self.want - amount, self.want)
+        self.itokens = np.where(
+            mask, self.itokens + amount * ONE // self.exchange_rate, self.itokens
+        )
+        self.mints = self.mints + mask
+
+    def borrow(self, amount, mask):
+        mask = self.live(mask)
+        supplys, borrows = self.get_current_position()
+        self.revert(mask & (borrows + amount > supplys * self.collateral_factor // ONE))
+        mask = self.live(mask)
+        self.want = np.where(mask, self.want + amount, self.want)
+        self.borrows = np.where(mask, self.borrows + amount, self.borrows)
+        self.borrow_calls = self.borrow_calls + mask
+
+    def redeem_underlying(self, amount, mask):
+        mask = self.live(mask)
+        redeemTokens = amount * ONE // self.exchange_rate
+        supplys, borrows = self.get_current_position()
+        remaining = (self.itokens - redeemTokens) * self.exchange_rate // ONE
+        self.revert(
+            mask
+            & (
+                (redeemTokens > self.itokens)
+                | (remaining * self.collateral_factor // ONE < borrows)
+            )
+        )
+        mask = self.live(mask)
+        self.want = np.where(mask, self.want + amount, self.want)
+        self.itokens = np.where(mask, self.itokens - redeemTokens, self.itokens)
+        self.redeems = self.redeems + mask
+
+    def repay_borrow(self, amount, mask):
+        mask = self.live(mask)
+        self.revert(mask & ((amount > self.want) | (amount > self.borrows)))
+        mask = self.live(mask)
+        self.want = np.where(mask, self.want - amount, self.want)
+        self.borrows = np.where(mask, self.borrows - amount, self.borrows)
+        self.repays = self.repays + mask
+
+    def sub_guard(self, positionChange, mask):
+        """
+        positionChange.sub(10), reverting where it would underflow
+        """
+        self.revert(np.asarray(mask) & (positionChange < POSITION_GUARD))
+        return np.where(
+            positionChange >= POSITION_GUARD, positionChange - POSITION_GUARD, 0
+        )
+
+    # ===== Strategy =====
+
+    def deposit(self, amount):
+        """
+        Vault deposit of amount want into the strategy, then _deposit
+        of the whole want balance, like BaseStrategy.deposit
+        """
+        self.want = np.where(self.live(), self.want + self.uint(amount), self.want)
+        amount = self.want.copy()
+        mask = self.live(amount >= self.min_want)
+        self.debt = np.where(mask, self.debt + amount, self.debt)
+        positionChange = self.borrow_position_need_to_increase(amount, mask)
+        self.increase_borrow(positionChange, amount, mask)
+
+    def withdraw_some(self, amount):
+        """
+        _withdrawSome, returns (amountActual, loss)
+        The amount actually withdrawn leaves the strategy for the vault
+        """
+        amount = self.uint(amount)
+        mask = self.live()
+        balance = self.want.copy()
+        supplys, borrows = self.get_current_position()
+        netPosition = supplys + balance - borrows
+
+        short = mask & (netPosition < amount)
+        release = short & (self.itokens > 1)
+        ## Release everything if the net position can't cover the amount
+        toReduce = np.where(short, supplys - borrows, amount - balance)
+        release |= mask & ~short & (balance < amount)
+
+        positionChange = self.borrow_position_need_to_reduce(toReduce, release)
+        self.release_borrow(positionChange, release)
+
+        amountActual = np.where(
+            release,
+            np.minimum(amount, self.want),
+            np.where(short, 0, amount),
+        )
+        amountActual = np.where(self.live(), amountActual, 0)
+        self.want = self.want - amountActual
+        loss = np.where(self.live(), amount - amountActual, 0)
+        return self.shaped(amountActual), self.shaped(loss)
+
+    def withdraw_all(self):
+        """
+        _withdrawAll, returns the want sent to the vault
+        """
+        _, borrows = self.get_current_position()
+        self.release_borrow(borrows, self.live())
+        sent = np.where(self.live(), self.want, 0)
+        self.want = self.want - sent
+        return self.shaped(sent)
+
+    def borrow_position_need_to_increase(self, amount, mask):
+        supplys, borrows = self.get_current_position()
+        self.revert(np.asarray(mask) & (supplys < borrows))
+        desireDeposits = supplys - borrows + amount
+        desireBorrows = (
+            desireDeposits * self.collateral_target // (ONE - self.collateral_target)
+        )
+        more = desireBorrows > borrows
+        ## Not enough to borrow more, just mint the deposit
+        self.mint(amount, np.asarray(mask) & ~more)
+        return np.where(more, desireBorrows - borrows, 0)
+
+    def borrow_position_need_to_reduce(self, amount, mask):
+        supplys, borrows = self.get_current_position()
+        self.revert(np.asarray(mask) & (supplys < borrows))
+        netDeposits = supplys - borrows
+        amount = np.minimum(amount, netDeposits)
+        desireDeposits = netDeposits - amount
+        desireBorrows = (
+            desireDeposits * self.collateral_target // (ONE - self.collateral_target)
+        )
+        self.revert(np.asarray(mask) & (borrows < desireBorrows))
+        return np.where(self.live(mask), borrows - desireBorrows, 0)
+
+    def increase_borrow(self, amount, stake, mask):
+        """
+        _IncreaseBorrow, leverages up to borrowDepth rounds
+        """
+        amount = amount.copy()
+        stake = stake.copy()
+        i = self.zeros()
+        active = self.live(mask) & (amount > self.min_want)
+        while active.any():
+            positionChange = self.leverage(amount, stake, active)
+            amount = np.where(active, amount - positionChange, amount)
+            stake = np.where(active, positionChange, stake)
+            i = i + active
+            ## Stake what was borrowed last
+            last = active & (amount < self.min_want)
+            depth = active & ~last & (i >= self.borrow_depth)
+            self.mint(stake, last | depth)
+            self.not_all |= self.live(depth)
+            active = self.live(active & ~depth) & (amount > self.min_want)
+        self.rounds = self.rounds + i
+
+    def leverage(self, amount, stake, mask):
+        """
+        _Leverage, mints stake and borrows against it
+        """
+        stake = np.where(self.want < stake, self.want, stake)
+        self.mint(stake, mask)
+        positionChange = stake * self.collateral_factor // ONE
+        positionChange = np.where(positionChange >= amount, amount, positionChange)
+        positionChange = self.sub_guard(positionChange, self.live(mask))
+        self.borrow(positionChange, mask)
+        return np.where(self.live(mask), positionChange, 0)
+
+    def release_borrow(self, amount, mask):
+        """
+        _ReleaseBorrow, deleverages up to borrowDepth rounds, then redeems
+        down to collateralTarget
+        """
+        amount = amount.copy()
+        i = self.zeros()
+        active = self.live(mask) & (amount > self.min_want)
+        while active.any():
+            supplys, borrows = self.get_current_position()
+            positionChange = self.deleverage(amount, supplys, borrows, active)
+            amount = np.where(active, amount - positionChange, amount)
+            i = i + active
+            depth = active & (i >= self.borrow_depth)
+            self.not_all |= self.live(depth)
+            active = self.live(active & ~depth) & (amount > self.min_want)
+        self.rounds = self.rounds + i
+
+        supplys, borrows = self.get_current_position()
+        reservedSupply = borrows * ONE // self.collateral_target
+        redeem = self.live(mask) & (supplys > reservedSupply)
+        self.redeem_underlying(np.where(redeem, supplys - reservedSupply, 0), redeem)
+
+    def deleverage(self, amount, supplys, borrows, mask):
+        """
+        _Deleverage, redeems and repays one round
+        """
+        mask = self.live(mask) & (borrows > 0)
+        desireSupplys = borrows * ONE // self.collateral_factor
+        self.revert(mask & (supplys < desireSupplys))
+        positionChange = np.where(supplys >= desireSupplys, supplys - desireSupplys, 0)
+        positionChange = np.where(positionChange >= borrows, borrows, positionChange)
+        positionChange = np.where(positionChange >= amount, amount, positionChange)
+        positionChange = self.sub_guard(positionChange, self.live(mask))
+        self.redeem_underlying(positionChange, mask)
+        self.repay_borrow(positionChange, mask)
+        return np.where(self.live(mask), positionChange, 0)
@@ -0,0 +1,230 @@
+import math
+
+from dotmap import DotMap
+
+from helpers.leverage_model import (
+    ONE,
+    COLLATERAL_TARGET,
+    BORROW_DEPTH,
+    MIN_WANT,
+    POSITION_GUARD,
+)
+
+"""
+  Closed forms of MyStrategy._IncreaseBorrow
+
+  Every round mints the stake and borrows stake * collateralFactor - 10 of it,
+  so the stake decays geometrically:
+
+    S(k+1) = floor(S(k) * f / 1e18) - 10
+    S(k)   ~ (S(0) + g) * r^k - g        with r = f / 1e18, g = 10 / (1 - r)
+
+  and supply converges to deposit / (1 - c), which is what
+  StrategyResolver.hook_after_earn checks.
+
+  round_borrow, borrowed_after, estimate_rounds and estimate_increase_borrow
+  evaluate that geometric series in O(1). Every floor loses under 1 wei, so
+  round k is at most 1 / (1 - r) wei under the series and the first k rounds
+  at most k / (1 - r), which can move the round count by one at a boundary.
+  solve_increase_borrow is the exact answer: it walks the scalar recurrence
+  instead of the mint/borrow state machine, and stops once the stake or the
+  amount left drops under minWant, which takes O(log(amount / minWant)) steps.
+  Positions are in underlying units; the iToken exchange rate truncation
+  is left to LeverageModel.
+"""
+
+
+def leverage_limit(deposit, collateral_ratio):
+    """
+    (supply, borrow) an endlessly repeated loop converges to
+    collateral_ratio is borrow / supply, as a float
+    """
+    supply = deposit / (1 - collateral_ratio)
+    return supply, supply * collateral_ratio
+
+
+def round_borrow(stake, collateral_factor, k):
+    """
+    S(k), what round k borrows before the amount left caps it, as a float
+    """
+    r = collateral_factor / ONE
+    g = POSITION_GUARD / (1 - r)
+    return (stake + g) * r ** k - g
+
+
+def borrowed_after(stake, collateral_factor, k):
+    """
+    S(1) + ... + S(k), what the first k rounds borrow, as a float
+    """
+    r = collateral_factor / ONE
+    g = POSITION_GUARD / (1 - r)
+    return (stake + g) * r * (1 - r ** k) / (1 - r) - g * k
+
+
+def estimate_rounds(amount, stake, collateral_factor, min_want=MIN_WANT):
+    """
+    Rounds the loop needs before amount left drops under min_want, ignoring
+    borrowDepth and the floors
+
+    Cumulative borrow after k rounds is (S(0) + g) * r * (1 - r^k) / (1 - r) - g * k,
+    this inverts the geometric part of it
+    """
+    r = collateral_factor / ONE
+    g = POSITION_GUARD / (1 - r)
+    ## Borrowing never gets closer than the geometric limit
+    reachable = (stake + g) * r / (1 - r)
+    target = amount - min_want
+    if target <= 0:
+        return 0
+    if target >= reachable:
+        return math.inf
+    return math.ceil(math.log(1 - target / reachable) / math.log(r))
+
+
+def estimate_increase_borrow(
+    amount,
+    stake,
+    collateral_factor,
+    borrow_depth=BORROW_DEPTH,
+    min_want=MIN_WANT,
+):
+    """
+    solve_increase_borrow from the geometric series, in O(1)
+
+    Amounts are floats within rounds / (1 - r) wei of the exact ones, rounds
+    can be one off where the floors push the amount left across min_want.
+    The sub(10) underflow isn't modelled, reverted is left out
+    """
+    rounds = min(
+        estimate_rounds(amount, stake, collateral_factor, min_want), borrow_depth
+    )
+    if rounds == 0:
+        borrowIncrease = 0
+        supplyIncrease = 0
+    else:
+        ## The last round borrows no more than is left, less the guard
+        borrowIncrease = min(
+            borrowed_after(stake, collateral_factor, rounds), amount - POSITION_GUARD
+        )
+        ## The stake and everything borrowed after it is minted
+        supplyIncrease = stake + borrowIncrease
+    amountLeft = amount - borrowIncrease
+
+    return DotMap(
+        supply_increase=supplyIncrease,
+        borrow_increase=borrowIncrease,
+        amount_left=amountLeft,
+        rounds=rounds,
+        mints=rounds + 1 if rounds else 0,
+        borrow_calls=rounds,
+        not_all=rounds > 0 and amountLeft >= min_want,
+    )
+
+
+def solve_increase_borrow(
+    amount,
+    stake,
+    collateral_factor,
+    borrow_depth=BORROW_DEPTH,
+    min_want=MIN_WANT,
+):
+    """
+    Exact outcome of _IncreaseBorrow(amount, stake), with the strategy holding
+    stake want to begin with
+
+    Returns a DotMap with the supply / borrow increase, the amount left to
+    borrow, rounds and call counts, not_all like the contract's return value,
+    and reverted where a sub(10) guard underflows
+    """
+    supplyIncrease = 0
+    borrowIncrease = 0
+    rounds = 0
+    mints = 0
+    notAll = False
+    reverted = False
+
+    while amount > min_want:
+        ## _Leverage
+        supplyIncrease += stake
+        mints += 1
+        positionChange = min(stake * collateral_factor // ONE, amount)
+        if positionChange < POSITION_GUARD:
+            reverted = True
+            break
+        positionChange -= POSITION_GUARD
+        borrowIncrease += positionChange
+
+        amount -= positionChange
+        stake = positionChange
+        rounds += 1
+        if amount < min_want or rounds >= borrow_depth:
+            supplyIncrease += stake
+            mints += 1
+            notAll = amount >= min_want
+            break
+
+    return DotMap(
+        supply_increase=supplyIncrease,
+        borrow_increase=borrowIncrease,
+        amount_left=amount,
+        rounds=rounds,
+        mints=mints,
+        borrow_calls=rounds,
+        not_all=notAll,
+        reverted=reverted,
+    )
+
+
+def solve_deposit(
+    amount,
+    collateral_factor,
+    supplys=0,
+    borrows=0,
+    collateral_target=COLLATERAL_TARGET,
+    borrow_depth=BORROW_DEPTH,
+    min_want=MIN_WANT,
+):
+    """
+    Exact positions after MyStrategy._deposit(amount) from (supplys, borrows)
+    """
+    if amount < min_want:
+        return DotMap(
+            supplys=supplys,
+            borrows=borrows,
+            want=amount,
+            position_change=0,
+            rounds=0,
+            mints=0,
+            borrow_calls=0,
+            not_all=False,
+            reverted=False,
+        )
+
+    ## borrowPositionNeedtoIncrease
+    desireBorrows = (
+        (supplys - borrows + amount) * collateral_target // (ONE - collateral_target)
+    )
+    if desireBorrows > borrows:
+        positionChange = desireBorrows - borrows
+        solved = solve_increase_borrow(
+            positionChange, amount, collateral_factor, borrow_depth, min_want
+        )
+    else:
+        ## Nothing to borrow, the deposit is only minted
+        positionChange = 0
+        solved = solve_increase_borrow(0, 0, collateral_factor, borrow_depth, min_want)
+        solved.supply_increase = amount
+        solved.mints = 1
+
+    return DotMap(
+        supplys=supplys + solved.supply_increase,
+        borrows=borrows + solved.borrow_increase,
+        ## Stake minted by every round but the last is borrowed again
+        want=amount + solved.borrow_increase - solved.supply_increase,
+        position_change=positionChange,
+        rounds=solved.rounds,
+        mints=solved.mints,
+        borrow_calls=solved.borrow_calls,
+        not_all=solved.not_all,
+        reverted=solved.reverted,
+    )
@@ -4,7 +4,8 @@ https://github.com/banteg/multicall.py
 """
 __version__ = "0.1.1"
 
-from helpers.multicall.signature import Signature
-from helpers.multicall.call import Call
+from helpers.multicall.signature import Signature, get_signature
+from helpers.multicall.call import Call, CallFailed, CALL_FAILED
+from helpers.multicall.plan import CallPlan
 from helpers.multicall.multicall import Multicall
 from helpers.multicall.functions import func, as_wei
@@ -1,18 +1,38 @@
 # Credit: https://github.com/banteg/multicall.py/blob/master/multicall/call.py
+from functools import lru_cache
+
 from eth_utils import to_checksum_address
 from brownie import web3
-from helpers.multicall import Signature
+from helpers.multicall.signature import get_signature
+
+
+class CallFailed:
+    """
+    Sentinel standing in for the value of a call that reverted in a tryAggregate
+    """
+
+    def __repr__(self):
+        return "CallFailed"
+
+    def __bool__(self):
+        return False
+
+
+CALL_FAILED = CallFailed()
+
+# Checksumming is a keccak per address, and snaps reuse the same few addresses
+checksum_address = lru_cache(maxsize=4096)(to_checksum_address)
 
 
 class Call:
     def __init__(self, target, function, returns=None):
-        self.target = to_checksum_address(target)
+        self.target = checksum_address(target)
         if isinstance(function, list):
             self.function, *self.args = function
         else:
             self.function = function
             self.args = None
-        self.signature = Signature(self.function)
+        self.signature = get_signature(self.function)
         self.returns = returns
 
     @property
@@ -29,8 +49,17 @@ class Call:
         else:
             return decoded if len(decoded) > 1 else decoded[0]
 
-    def __call__(self, args=None):
+    def failed_output(self):
+        """
+        Same shape as decode_output, with every value set to CALL_FAILED
+        """
+        if self.returns:
+            return {name: CALL_FAILED for name, handler in self.returns}
+        else:
+            return CALL_FAILED
+
+    def __call__(self, args=None, block_identifier=None):
         args = args or self.args
         calldata = self.signature.encode_data(args)
-        output = web3.eth.call({"to": self.target, "data": calldata})
+        output = web3.eth.call({"to": self.target, "data": calldata}, block_identifier)
         return self.decode_output(output)
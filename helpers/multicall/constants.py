@@ -29,3 +29,24 @@ MULTICALL_ADDRESSES = {
     Network.Arbitrum: "0x7A7443F8c577d537f1d8cD4a629d40a3148Dd7ee",
     Network.Hardhat: "0x7A7443F8c577d537f1d8cD4a629d40a3148Dd7ee",
 }
+
+# Multicall2 interface (tryAggregate / tryBlockAndAggregate / blockAndAggregate),
+# used when calls may fail. Every entry is the Multicall3 deployment: Multicall3
+# keeps the Multicall2 functions with the same selectors and return types, and
+# unlike Multicall2 it sits at one address on every network listed here (a
+# local node that isn't a fork has neither)
+MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+MULTICALL2_ADDRESSES = {network: MULTICALL3_ADDRESS for network in Network}
+
+# Upper bounds for a single aggregate eth_call, in bytes.
+# Fantom and most public RPCs reject oversized requests/responses well before
+# the gas cap is reached, so chunks are sized by estimated payload instead.
+MULTICALL_MAX_CALLDATA_BYTES = 48_000
+MULTICALL_MAX_RETURNDATA_BYTES = 96_000
+MULTICALL_MAX_CALLS = 500
+
+# Chunks are dispatched one after another unless more workers are requested
+MULTICALL_MAX_WORKERS = 1
+
+# Dynamic return types (string, address[], ...) have no static size
+DYNAMIC_RETURN_SIZE_ESTIMATE = 512
@@ -45,11 +45,49 @@ strategy = DotMap(
     sharesOfPool="sharesOfPool()(uint256)",
     sharesOfWant="sharesOfWant()(uint256)",
     sharesOf="sharesOf()(uint256)",
+    iToken="iToken()(address)",
+    comptroller="comptroller()(address)",
+    screamToken="screamToken()(address)",
+    want="want()(address)",
+    interestRateModel="interestRateModel()(address)",
+    unirouter="unirouter()(address)",
+    swapToWantRoute="swapToWantRoute(uint256)(address)",
+    getCurrentPosition="getCurrentPosition()(uint256,uint256)",
     getTimelySupplyPosition="getTimelySupplyPosition()(uint256)",
     getTimelyBorrowPosition="getTimelyBorrowPosition()(uint256)",
     collateralTarget="collateralTarget()(uint256)",
     minWant="minWant()(uint256)",
 )
+iToken = DotMap(
+    accrualBlockNumber="accrualBlockNumber()(uint256)",
+    totalBorrows="totalBorrows()(uint256)",
+    totalReserves="totalReserves()(uint256)",
+    borrowIndex="borrowIndex()(uint256)",
+    reserveFactorMantissa="reserveFactorMantissa()(uint256)",
+    exchangeRateStored="exchangeRateStored()(uint256)",
+    borrowBalanceStored="borrowBalanceStored(address)(uint256)",
+)
+comptroller = DotMap(
+    compSpeeds="compSpeeds(address)(uint256)",
+    # CompMarketState(uint224 index, uint32 block)
+    compSupplyState="compSupplyState(address)(uint224,uint32)",
+    compBorrowState="compBorrowState(address)(uint224,uint32)",
+    compAccrued="compAccrued(address)(uint256)",
+    # (isListed, collateralFactorMantissa, isComped)
+    markets="markets(address)(bool,uint256,bool)",
+)
+interestRateModel = DotMap(
+    getBorrowRate="getBorrowRate(uint256,uint256,uint256)(uint256)",
+)
+uniswapRouter = DotMap(
+    factory="factory()(address)",
+    getAmountsOut="getAmountsOut(uint256,address[])(uint256[])",
+)
+uniswapFactory = DotMap(getPair="getPair(address,address)(address)")
+uniswapPair = DotMap(
+    token0="token0()(address)",
+    getReserves="getReserves()(uint112,uint112,uint32)",
+)
 harvestFarm = DotMap(earned="earned()(uint256)")
 rewardPool = DotMap(
     # claimable rewards
@@ -75,4 +113,10 @@ func = DotMap(
     diggFaucet=diggFaucet,
     digg=digg,
     pancakeChef=pancakeChef,
+    iToken=iToken,
+    comptroller=comptroller,
+    interestRateModel=interestRateModel,
+    uniswapRouter=uniswapRouter,
+    uniswapFactory=uniswapFactory,
+    uniswapPair=uniswapPair,
 )
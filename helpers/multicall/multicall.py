@@ -1,18 +1,74 @@
 # Credit: https://github.com/banteg/multicall.py/blob/master/multicall/multicall.py
-from typing import List
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Union
 
 from brownie import web3
 
 from helpers.multicall import Call
-from helpers.multicall.constants import MULTICALL_ADDRESSES
+from helpers.multicall.constants import (
+    MULTICALL_MAX_CALLDATA_BYTES,
+    MULTICALL_MAX_RETURNDATA_BYTES,
+    MULTICALL_MAX_CALLS,
+    MULTICALL_MAX_WORKERS,
+)
+from helpers.multicall.plan import CallPlan
 from rich.console import Console
 
 console = Console()
 
+# Counters and timings (seconds) of the last Multicall run
+# Chunks can run in parallel, the *_time entries are summed over them
+STATS = (
+    "calls",
+    "chunks",
+    "rpcs",
+    "bytes_sent",
+    "bytes_received",
+    "encode_time",
+    "rpc_time",
+    "decode_time",
+)
+
+
+def block_number(block_identifier):
+    """
+    Number of the block a block identifier stands for: a number, a tag such
+    as "latest" or a block hash
+    """
+    if isinstance(block_identifier, int):
+        return block_identifier
+    return web3.eth.get_block(block_identifier)["number"]
+
 
 class Multicall:
-    def __init__(self, calls: List[Call]):
-        self.calls = calls
+    def __init__(
+        self,
+        calls: Union[List[Call], CallPlan],
+        max_calldata=MULTICALL_MAX_CALLDATA_BYTES,
+        max_returndata=MULTICALL_MAX_RETURNDATA_BYTES,
+        max_calls=MULTICALL_MAX_CALLS,
+        max_workers=MULTICALL_MAX_WORKERS,
+        require_success=True,
+        block_identifier=None,
+    ):
+        # calls can also be a CallPlan compiled earlier, which is reused as is
+        if isinstance(calls, CallPlan):
+            self.plan = calls
+        else:
+            self.plan = CallPlan(
+                calls, require_success, max_calldata, max_returndata, max_calls
+            )
+        self.calls = self.plan.calls
+        self.require_success = self.plan.require_success
+        # > 1 sends the chunk eth_calls in parallel over a bounded thread pool
+        self.max_workers = max_workers
+        # Block number (or tag) every chunk runs at, None for latest
+        self.block_identifier = block_identifier
+        self.block = None
+        self.stats = dict.fromkeys(STATS, 0)
+        self.lock = threading.Lock()
 
     def printCalls(self):
         for call in self.calls:
@@ -20,14 +76,110 @@ class Multicall:
                 {"target": call.target, "function": call.function, "args": call.args}
             )
 
-    def __call__(self):
-        aggregate = Call(
-            MULTICALL_ADDRESSES[web3.eth.chainId],
-            "aggregate((address,bytes)[])(uint256,bytes[])",
+    def chunks(self):
+        return self.plan.chunks
+
+    def count(self, **amounts):
+        with self.lock:
+            for name, amount in amounts.items():
+                self.stats[name] += amount
+
+    def latest_block(self):
+        self.count(rpcs=1)
+        return web3.eth.block_number
+
+    def send(self, calls, block_identifier=None, calldata=None):
+        """
+        Sends one aggregate eth_call, returns its raw output
+        """
+        started = time.perf_counter()
+        if calldata is None:
+            calldata = self.plan.encode(calls)
+        sent = time.perf_counter()
+        output = web3.eth.call(
+            {"to": self.plan.target, "data": calldata}, block_identifier
         )
-        args = [[[call.target, call.data] for call in self.calls]]
-        block, outputs = aggregate(args)
-        result = {}
-        for call, output in zip(self.calls, outputs):
-            result.update(call.decode_output(output))
+        self.count(
+            rpcs=1,
+            bytes_sent=len(calldata),
+            bytes_received=len(output),
+            encode_time=sent - started,
+            rpc_time=time.perf_counter() - sent,
+        )
+        return output
+
+    def decode(self, calls, output):
+        started = time.perf_counter()
+        result = self.plan.decode(output, len(calls))
+        self.count(decode_time=time.perf_counter() - started)
         return result
+
+    def aggregate(self, calls, block_identifier=None, calldata=None):
+        """
+        Runs one aggregate eth_call
+        Returns the block it ran at and (success, output) in call order
+        """
+        return self.decode(calls, self.send(calls, block_identifier, calldata))
+
+    def execute(self, calls, block_identifier=None, calldata=None):
+        """
+        Runs a chunk, bisecting and retrying it when the node rejects it
+        Only a single call that still fails is raised
+        Malformed return data is raised as is, smaller chunks won't fix it
+        """
+        try:
+            output = self.send(calls, block_identifier, calldata)
+        except (ValueError, IOError):
+            if len(calls) == 1:
+                raise
+            if block_identifier is None:
+                # Both halves must read the same state
+                block_identifier = self.latest_block()
+            half = len(calls) // 2
+            block, first = self.execute(calls[:half], block_identifier)
+            block, second = self.execute(calls[half:], block_identifier)
+            return block, first + second
+        return self.decode(calls, output)
+
+    def dispatch(self):
+        """
+        Runs every chunk against the same block, results keep chunk order
+        """
+        block = self.block_identifier
+        jobs = list(zip(self.plan.chunks, self.plan.calldata))
+        if len(jobs) <= 1:
+            return [self.execute(calls, block, calldata) for calls, calldata in jobs]
+
+        # Otherwise a block mined between chunks would mix two states
+        if block is None:
+            block = self.latest_block()
+        if self.max_workers > 1:
+            workers = min(self.max_workers, len(jobs))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                # map yields in submission order, whatever finishes first
+                return list(
+                    executor.map(lambda job: self.execute(job[0], block, job[1]), jobs)
+                )
+        return [self.execute(calls, block, calldata) for calls, calldata in jobs]
+
+    def __call__(self):
+        self.stats = dict.fromkeys(STATS, 0)
+        self.stats["calls"] = len(self.calls)
+        self.stats["chunks"] = len(self.plan.chunks)
+        blocks = set()
+        outputs = []
+        for block, chunk_outputs in self.dispatch():
+            blocks.add(block)
+            outputs += chunk_outputs
+
+        if len(blocks) > 1:
+            raise Exception(
+                "Multicall chunks ran at different blocks {}".format(blocks)
+            )
+        # Block number the aggregate reported, None if there was nothing to call
+        self.block = blocks.pop() if blocks else None
+
+        started = time.perf_counter()
+        data = self.plan.decode_outputs(outputs)
+        self.count(decode_time=time.perf_counter() - started)
+        return data
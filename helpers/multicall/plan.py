@@ -0,0 +1,203 @@
+from brownie import web3
+from eth_abi.exceptions import DecodingError
+
+from helpers.multicall.constants import (
+    MULTICALL_ADDRESSES,
+    MULTICALL2_ADDRESSES,
+    MULTICALL_MAX_CALLDATA_BYTES,
+    MULTICALL_MAX_RETURNDATA_BYTES,
+    MULTICALL_MAX_CALLS,
+    DYNAMIC_RETURN_SIZE_ESTIMATE,
+)
+from helpers.multicall.signature import estimate_encoded_size, get_signature
+
+AGGREGATE = "aggregate((address,bytes)[])(uint256,bytes[])"
+TRY_BLOCK_AND_AGGREGATE = (
+    "tryBlockAndAggregate(bool,(address,bytes)[])(uint256,bytes32,(bool,bytes)[])"
+)
+
+
+def estimate_call_size(call):
+    """
+    Returns (calldata, returndata) bytes a call adds to an aggregate payload
+    """
+    # (address,bytes) tuple: offset + address + bytes offset + length + padded data
+    data = call.data
+    calldata = 4 * 32 + (len(data) + 31) // 32 * 32
+
+    # bytes[] member: offset + length + padded output
+    returndata = 2 * 32 + estimate_encoded_size(
+        call.signature.output_types, DYNAMIC_RETURN_SIZE_ESTIMATE
+    )
+    return calldata, returndata
+
+
+def chunk_calls(
+    calls,
+    max_calldata=MULTICALL_MAX_CALLDATA_BYTES,
+    max_returndata=MULTICALL_MAX_RETURNDATA_BYTES,
+    max_calls=MULTICALL_MAX_CALLS,
+):
+    """
+    Greedily splits calls into ordered chunks that fit the payload limits
+    A single call larger than the limits gets a chunk of its own
+    """
+    chunks = []
+    chunk = []
+    chunk_calldata = chunk_returndata = 0
+    for call in calls:
+        calldata, returndata = estimate_call_size(call)
+        if chunk and (
+            chunk_calldata + calldata > max_calldata
+            or chunk_returndata + returndata > max_returndata
+            or len(chunk) >= max_calls
+        ):
+            chunks.append(chunk)
+            chunk = []
+            chunk_calldata = chunk_returndata = 0
+        chunk.append(call)
+        chunk_calldata += calldata
+        chunk_returndata += returndata
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def _word(data, offset):
+    if offset + 32 > len(data):
+        raise ValueError(
+            "Aggregate return data is {} bytes, read past it at {}".format(
+                len(data), offset
+            )
+        )
+    return int.from_bytes(data[offset : offset + 32], "big")
+
+
+def _bytes_at(data, offset):
+    """
+    ABI bytes member whose length word sits at offset
+    """
+    start = offset + 32
+    end = start + _word(data, offset)
+    if end > len(data):
+        raise ValueError("bytes member runs past the aggregate return data")
+    return data[start:end]
+
+
+def split_aggregate(data):
+    """
+    (uint256,bytes[]) aggregate return data to (block, [(True, output)])
+    Walks the ABI offsets in one pass instead of a generic eth_abi decode
+    """
+    data = bytes(data)
+    block = _word(data, 0)
+    array = _word(data, 32)
+    head = array + 32
+    outputs = []
+    for i in range(_word(data, array)):
+        outputs.append((True, _bytes_at(data, head + _word(data, head + 32 * i))))
+    return block, outputs
+
+
+def split_try_block_and_aggregate(data):
+    """
+    (uint256,bytes32,(bool,bytes)[]) return data to (block, [(success, output)])
+    """
+    data = bytes(data)
+    block = _word(data, 0)
+    array = _word(data, 64)
+    head = array + 32
+    results = []
+    for i in range(_word(data, array)):
+        item = head + _word(data, head + 32 * i)
+        success = _word(data, item) != 0
+        results.append((success, _bytes_at(data, item + _word(data, item + 32))))
+    return block, results
+
+
+class CallPlan:
+    """
+    A list of calls compiled once for repeated Multicall execution
+    Holds the chunking, the pre-encoded aggregate calldata of every chunk
+    and a decoder table, so running it again does no call construction
+    """
+
+    def __init__(
+        self,
+        calls,
+        require_success=True,
+        max_calldata=MULTICALL_MAX_CALLDATA_BYTES,
+        max_returndata=MULTICALL_MAX_RETURNDATA_BYTES,
+        max_calls=MULTICALL_MAX_CALLS,
+    ):
+        self.calls = calls
+        # False uses Multicall2, reverted calls come back as CALL_FAILED
+        self.require_success = require_success
+        if require_success:
+            self.target = MULTICALL_ADDRESSES[web3.eth.chainId]
+            self.aggregate = get_signature(AGGREGATE)
+        else:
+            self.target = MULTICALL2_ADDRESSES[web3.eth.chainId]
+            self.aggregate = get_signature(TRY_BLOCK_AND_AGGREGATE)
+
+        self.chunks = chunk_calls(calls, max_calldata, max_returndata, max_calls)
+        self.calldata = [self.encode(chunk) for chunk in self.chunks]
+
+        # Decoder table, one (call, value on failure) per call
+        self.decoders = [(call, call.failed_output()) for call in calls]
+
+    def encode(self, calls):
+        """
+        Aggregate calldata for the given calls
+        """
+        args = [[call.target, call.data] for call in calls]
+        if self.require_success:
+            return self.aggregate.encode_data([args])
+        return self.aggregate.encode_data([False, args])
+
+    def decode(self, output, count):
+        """
+        Decodes aggregate return data of count calls into the block and
+        (success, output) pairs
+        """
+        if not output:
+            # What a call to an address without code returns
+            raise ValueError(
+                "Empty aggregate return data, no multicall contract at {}?".format(
+                    self.target
+                )
+            )
+        if self.require_success:
+            block, results = split_aggregate(output)
+        else:
+            block, results = split_try_block_and_aggregate(output)
+        if len(results) != count:
+            raise ValueError(
+                "Aggregate returned {} results for {} calls".format(len(results), count)
+            )
+        return block, results
+
+    def decode_outputs(self, results):
+        """
+        Decodes every (success, output) of the plan into one result dict
+        """
+        if len(results) != len(self.decoders):
+            raise ValueError(
+                "{} results for a plan of {} calls".format(
+                    len(results), len(self.decoders)
+                )
+            )
+        items = []
+        for (call, failed), (success, output) in zip(self.decoders, results):
+            if not success:
+                decoded = failed
+            elif self.require_success:
+                decoded = call.decode_output(output)
+            else:
+                try:
+                    decoded = call.decode_output(output)
+                except DecodingError:
+                    # e.g. empty return data from a target with no code
+                    decoded = failed
+            items += decoded.items()
+        return dict(items)
@@ -1,6 +1,11 @@
 # Credit: https://github.com/banteg/multicall.py/blob/master/multicall/signature.py
 
-from eth_abi import encode_single, decode_single
+from functools import lru_cache
+
+from eth_abi.decoding import ContextFramesBytesIO
+from eth_abi.exceptions import NonEmptyPaddingBytes
+from eth_abi.grammar import TupleType, parse
+from eth_abi.registry import registry
 from eth_utils import function_signature_to_4byte_selector
 
 
@@ -25,6 +30,102 @@ def parse_signature(signature):
     return parts
 
 
+def _static_size(abi_type):
+    """
+    Size in bytes of a static ABI type once encoded
+    """
+    if isinstance(abi_type, TupleType):
+        size = sum(_static_size(component) for component in abi_type.components)
+    else:
+        size = 32
+    for dims in abi_type.arrlist or []:
+        size *= dims[0]
+    return size
+
+
+def estimate_encoded_size(types, dynamic_estimate):
+    """
+    Estimates the encoded size of '(uint256,address[])' style types
+    Dynamic members are counted as head word + dynamic_estimate
+    """
+    size = 0
+    for component in parse(types).components:
+        if component.is_dynamic:
+            size += 32 + dynamic_estimate
+        else:
+            size += _static_size(component)
+    return size
+
+
+def _dirty(word):
+    # Same error eth_abi raises for non zero padding
+    raise NonEmptyPaddingBytes("Padding bytes of {} are not empty".format(word.hex()))
+
+
+def _uint_decoder(bits):
+    bound = 1 << bits
+
+    def decode(word):
+        value = int.from_bytes(word, "big")
+        if value >= bound:
+            _dirty(word)
+        return value
+
+    return decode
+
+
+def _int_decoder(bits):
+    bound = 1 << (bits - 1)
+
+    def decode(word):
+        value = int.from_bytes(word, "big", signed=True)
+        if not -bound <= value < bound:
+            _dirty(word)
+        return value
+
+    return decode
+
+
+def _decode_bool(word):
+    value = int.from_bytes(word, "big")
+    if value > 1:
+        _dirty(word)
+    return value == 1
+
+
+def _decode_address(word):
+    if any(word[:12]):
+        _dirty(word)
+    # Same lowercase form eth_abi returns
+    return "0x" + word[12:].hex()
+
+
+WORD_DECODERS = {
+    "uint": lambda component: _uint_decoder(int(component.sub or 256)),
+    "int": lambda component: _int_decoder(int(component.sub or 256)),
+    "bool": lambda component: _decode_bool,
+    "address": lambda component: _decode_address,
+}
+
+
+def word_decoders(types):
+    """
+    One decoder per 32 byte word when types only holds static value types
+    None when it has a dynamic, array or tuple member, those go to eth_abi
+    Decoders reject the words eth_abi rejects (values over the type's width)
+    """
+    decoders = []
+    for component in parse(types).components:
+        if (
+            isinstance(component, TupleType)
+            or component.arrlist
+            or component.base not in WORD_DECODERS
+        ):
+            return None
+        decoders.append(WORD_DECODERS[component.base](component))
+    return decoders
+
+
 class Signature:
     def __init__(self, signature):
         self.signature = signature
@@ -33,13 +134,33 @@ class Signature:
         self.output_types = self.parts[2]
         self.function = "".join(self.parts[:2])
         self.fourbyte = function_signature_to_4byte_selector(self.function)
+        # Prebuilt codecs, same as encode_single / decode_single minus the lookups
+        self.encoder = registry.get_encoder(self.input_types)
+        self.decoder = registry.get_decoder(self.output_types)
+        # Fast path for outputs made only of uint/int/bool/address words
+        self.words = word_decoders(self.output_types)
 
     def encode_data(self, args=None):
-        return (
-            self.fourbyte + encode_single(self.input_types, args)
-            if args
-            else self.fourbyte
-        )
+        return self.fourbyte + self.encoder(args) if args else self.fourbyte
 
     def decode_data(self, output):
-        return decode_single(self.output_types, output)
+        words = self.words
+        if words is not None and len(output) >= 32 * len(words):
+            if type(output) is not bytes:
+                # HexBytes slices and hex() differently
+                output = bytes(output)
+            if len(words) == 1:
+                return (words[0](output[:32]),)
+            return tuple(
+                decode(output[32 * i : 32 * i + 32]) for i, decode in enumerate(words)
+            )
+        return self.decoder(ContextFramesBytesIO(output))
+
+
+@lru_cache(maxsize=None)
+def get_signature(signature):
+    """
+    Process-wide Signature cache keyed by signature string
+    Parsing, the keccak selector and codec lookup run once per signature
+    """
+    return Signature(signature)
@@ -0,0 +1,306 @@
+import numpy as np
+from dotmap import DotMap
+
+from helpers.multicall import Call, Multicall, CALL_FAILED, func
+from helpers.shares_math import as_uint_array
+
+"""
+  Off-chain MyStrategy.balanceOfPool
+
+  fetch() reads the raw iToken / comptroller / pair state the contract reads,
+  in one multicall plus one getBorrowRate call, and predict() replays
+  predictSupplyBorrow, predictCompAccrued and getAmountsOut on it for any
+  array of block numbers. Until the next transaction touches the market,
+  that is a whole horizon of balanceOfPool values for two round trips.
+
+  validate() compares the prediction with the on-chain balanceOfPool.
+"""
+
+ONE = 10 ** 18
+## SpookySwap takes 0.2% on every hop
+SWAP_FEE = 998
+SWAP_FEE_BASE = 1000
+MAX_ROUTE_LENGTH = 4
+
+
+def get_amount_out(amount_in, reserve_in, reserve_out, fee=SWAP_FEE):
+    """
+    UniswapV2Library.getAmountOut
+    """
+    amount_in_with_fee = amount_in * fee
+    return (
+        amount_in_with_fee
+        * reserve_out
+        // (reserve_in * SWAP_FEE_BASE + amount_in_with_fee)
+    )
+
+
+class PoolPredictor:
+    def __init__(self, strategy, fee=SWAP_FEE):
+        self.strategy = strategy
+        self.fee = fee
+        self.addresses = None
+
+    # ===== Fetch =====
+
+    def resolve(self):
+        """
+        Strategy constants, router factory and route pairs, read once
+        """
+        if self.addresses is not None:
+            return self.addresses
+        strategy = self.strategy.address
+        calls = [
+            Call(strategy, [getattr(func.strategy, name)], [[name, None]])
+            for name in (
+                "iToken",
+                "comptroller",
+                "screamToken",
+                "want",
+                "interestRateModel",
+                "unirouter",
+            )
+        ]
+        calls += [
+            Call(
+                strategy,
+                [func.strategy.swapToWantRoute, i],
+                [["route." + str(i), None]],
+            )
+            for i in range(MAX_ROUTE_LENGTH)
+        ]
+        data = Multicall(calls, require_success=False)()
+        addresses = DotMap(
+            {key: value for key, value in data.items() if "." not in key}
+        )
+        addresses.route = []
+        for i in range(MAX_ROUTE_LENGTH):
+            if data["route." + str(i)] is CALL_FAILED:
+                break
+            addresses.route.append(data["route." + str(i)])
+
+        factory = Call(addresses.unirouter, [func.uniswapRouter.factory])()
+        route = addresses.route
+        pairs = Multicall(
+            [
+                Call(factory, [func.uniswapFactory.getPair, a, b], [[str(i), None]])
+                for i, (a, b) in enumerate(zip(route, route[1:]))
+            ]
+        )()
+        addresses.pairs = [pairs[str(i)] for i in range(len(route) - 1)]
+        token0s = Multicall(
+            [
+                Call(pair, [func.uniswapPair.token0], [[str(i), None]])
+                for i, pair in enumerate(addresses.pairs)
+            ]
+        )()
+        ## Whether each hop swaps token0 for token1
+        addresses.zeroForOne = [
+            token0s[str(i)] == route[i] for i in range(len(addresses.pairs))
+        ]
+        self.addresses = addresses
+        return addresses
+
+    def fetch_calls(self):
+        addresses = self.resolve()
+        strategy = self.strategy.address
+        iToken = addresses.iToken
+        comptroller = addresses.comptroller
+        calls = [
+            Call(iToken, [func.erc20.balanceOf, strategy], [["amountToken", None]]),
+            Call(iToken, [func.erc20.totalSupply], [["totalSupply", None]]),
+            Call(addresses.want, [func.erc20.balanceOf, iToken], [["cash", None]]),
+            Call(
+                addresses.screamToken,
+                [func.erc20.balanceOf, strategy],
+                [["compBal", None]],
+            ),
+            Call(
+                iToken,
+                [func.iToken.borrowBalanceStored, strategy],
+                [["borrowBalanceStored", None]],
+            ),
+            Call(
+                comptroller,
+                [func.comptroller.compSpeeds, iToken],
+                [["compSpeed", None]],
+            ),
+            Call(
+                comptroller,
+                [func.comptroller.compSupplyState, iToken],
+                [["compSupplyIndex", None], ["compSupplyBlock", None]],
+            ),
+            Call(
+                comptroller,
+                [func.comptroller.compBorrowState, iToken],
+                [["compBorrowIndex", None], ["compBorrowBlock", None]],
+            ),
+            Call(
+                comptroller,
+                [func.comptroller.compAccrued, strategy],
+                [["compAccrued", None]],
+            ),
+        ]
+        calls += [
+            Call(iToken, [getattr(func.iToken, name)], [[name, None]])
+            for name in (
+                "accrualBlockNumber",
+                "totalBorrows",
+                "totalReserves",
+                "borrowIndex",
+                "reserveFactorMantissa",
+                "exchangeRateStored",
+            )
+        ]
+        calls += [
+            Call(
+                pair,
+                [func.uniswapPair.getReserves],
+                [
+                    ["reserve0." + str(i), None],
+                    ["reserve1." + str(i), None],
+                    ["reserveTimestamp." + str(i), None],
+                ],
+            )
+            for i, pair in enumerate(addresses.pairs)
+        ]
+        return calls
+
+    def fetch(self, block_identifier=None):
+        """
+        Raw state balanceOfPool depends on, all read at one block
+        """
+        addresses = self.resolve()
+        multi = Multicall(self.fetch_calls(), block_identifier=block_identifier)
+        data = multi()
+        state = DotMap(data)
+        state.block = multi.block
+
+        ## The rate only depends on stored state, so it holds for every later block
+        state.borrowRate = Call(
+            addresses.interestRateModel,
+            [
+                func.interestRateModel.getBorrowRate,
+                state.cash,
+                state.totalBorrows,
+                state.totalReserves,
+            ],
+        )(block_identifier=state.block)
+
+        state.reserves = []
+        for i, zeroForOne in enumerate(addresses.zeroForOne):
+            reserve0 = data["reserve0." + str(i)]
+            reserve1 = data["reserve1." + str(i)]
+            state.reserves.append(
+                (reserve0, reserve1) if zeroForOne else (reserve1, reserve0)
+            )
+        return state
+
+    # ===== Predict =====
+
+    def predict_supply_borrow(self, state, blocks):
+        """
+        MyStrategy.predictSupplyBorrow at every block in blocks
+        """
+        blocks = as_uint_array(blocks)
+        if state.amountToken == 0:
+            zeros = np.zeros(blocks.shape, dtype=object)
+            return zeros, zeros.copy()
+        if np.any(blocks < state.accrualBlockNumber):
+            raise Exception(
+                "Cannot predict before block {}".format(state.accrualBlockNumber)
+            )
+
+        simpleInterestFactor = (blocks - state.accrualBlockNumber) * state.borrowRate
+        interestAccumulated = simpleInterestFactor * state.totalBorrows // ONE
+        totalBorrows = interestAccumulated + state.totalBorrows
+        totalReserves = (
+            state.reserveFactorMantissa * interestAccumulated // ONE
+            + state.totalReserves
+        )
+        borrowIndex = (
+            simpleInterestFactor * state.borrowIndex // ONE + state.borrowIndex
+        )
+
+        exchangeRate = (
+            (state.cash + totalBorrows - totalReserves) * ONE // state.totalSupply
+        )
+        supplys = exchangeRate * state.amountToken // ONE
+        borrows = state.borrowBalanceStored * borrowIndex // state.borrowIndex
+        return supplys, borrows
+
+    def predict_comp_accrued(self, state, blocks):
+        """
+        MyStrategy.predictCompAccrued at every block in blocks
+        """
+        blocks = as_uint_array(blocks)
+        ## getCurrentPosition, on stored values
+        supplys = state.amountToken * state.exchangeRateStored // ONE
+        borrows = state.borrowBalanceStored
+        totalSupply = state.totalSupply * state.exchangeRateStored // ONE
+
+        blockShareSupply = 0
+        if totalSupply > 0:
+            blockShareSupply = supplys * state.compSpeed // totalSupply
+        blockShareBorrow = 0
+        if state.totalBorrows > 0:
+            blockShareBorrow = borrows * state.compSpeed // state.totalBorrows
+
+        return (
+            blockShareSupply * (blocks - state.compSupplyBlock)
+            + blockShareBorrow * (blocks - state.compBorrowBlock)
+            + state.compAccrued
+        )
+
+    def get_amounts_out(self, state, amount):
+        """
+        Last hop of router.getAmountsOut(amount, swapToWantRoute)
+        """
+        for reserveIn, reserveOut in state.reserves:
+            amount = get_amount_out(amount, reserveIn, reserveOut, self.fee)
+        return amount
+
+    def predict(self, state, blocks):
+        """
+        balanceOfPool and its parts at every block in blocks
+        """
+        blocks = as_uint_array(blocks)
+        supplys, borrows = self.predict_supply_borrow(state, blocks)
+        compPredict = self.predict_comp_accrued(state, blocks)
+        claimableComp = np.array(state.compBal + compPredict, dtype=object)
+        ## getAmountsOut reverts on 0, which the contract never asks for
+        claimableWant = np.where(
+            claimableComp > 0,
+            self.get_amounts_out(state, np.where(claimableComp > 0, claimableComp, 1)),
+            0,
+        )
+        return DotMap(
+            blocks=blocks,
+            supplys=supplys,
+            borrows=borrows,
+            compPredict=compPredict,
+            claimableWant=claimableWant,
+            balanceOfPool=supplys + claimableWant - borrows,
+        )
+
+    def project(self, horizon, step=1, block_identifier=None):
+        """
+        balanceOfPool over the next horizon blocks, from a single fetch
+        """
+        state = self.fetch(block_identifier)
+        blocks = np.arange(state.block, state.block + horizon + 1, step).astype(object)
+        return self.predict(state, blocks)
+
+    def validate(self, blocks):
+        """
+        Predicted vs on-chain balanceOfPool at each sampled block
+        """
+        results = []
+        for block in blocks:
+            state = self.fetch(block)
+            predicted = self.predict(state, block).balanceOfPool
+            actual = self.strategy.balanceOfPool(block_identifier=block)
+            results.append(
+                DotMap(block=block, predicted=int(predicted), actual=int(actual))
+            )
+        return results
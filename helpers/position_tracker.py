@@ -0,0 +1,282 @@
+import time
+from collections import deque
+
+from brownie import web3
+from dotmap import DotMap
+
+from helpers.multicall import Call, CallPlan, Multicall, CALL_FAILED, func
+
+"""
+  Streaming block by block tracker of MyStrategy positions
+
+  A generator pipeline, every stage consuming the one before:
+
+    new_blocks()                 block numbers as they are mined
+    poll(strategies, blocks)     one multicall per block, for every strategy
+    positions(snaps)             per strategy records, with the collateral ratio
+    rolling(records, window)     rolling mean / min / max per metric
+    threshold_events(records)    ratio drifting toward the collateral factor
+
+  track() wires them together:
+
+    for record in track([strategy], window=100):
+        for event in record.events:
+            console.print(event)
+
+  All strategies are read in the same aggregate, so a block costs one eth_call
+  however many strategies are monitored, and the CallPlan is compiled once.
+  Rolling windows are bounded deques, so memory stays fixed per metric.
+"""
+
+ONE = 10 ** 18
+METRICS = ("supplys", "borrows", "ratio", "compAccrued", "balanceOfPool")
+## Warn once the ratio is within this share of the collateral factor, scaled by 1e18
+COLLATERAL_FACTOR_MARGIN = 5 * 10 ** 16
+
+
+def resolve_markets(strategies):
+    """
+    (iToken, comptroller) of every strategy, read once in a single multicall
+    """
+    calls = []
+    for i, strategy in enumerate(strategies):
+        calls.append(
+            Call(strategy, [func.strategy.iToken], [[str(i) + ".iToken", None]])
+        )
+        calls.append(
+            Call(
+                strategy,
+                [func.strategy.comptroller],
+                [[str(i) + ".comptroller", None]],
+            )
+        )
+    data = Multicall(calls)()
+    return [
+        (data[str(i) + ".iToken"], data[str(i) + ".comptroller"])
+        for i in range(len(strategies))
+    ]
+
+
+def position_calls(strategies):
+    """
+    Calls reading every tracked metric of every strategy, keyed <index>.<metric>
+    """
+    calls = []
+    for i, (strategy, (iToken, comptroller)) in enumerate(
+        zip(strategies, resolve_markets(strategies))
+    ):
+        key = str(i) + "."
+        calls += [
+            Call(
+                strategy,
+                [func.strategy.getCurrentPosition],
+                [[key + "supplys", None], [key + "borrows", None]],
+            ),
+            Call(
+                strategy,
+                [func.strategy.collateralTarget],
+                [[key + "collateralTarget", None]],
+            ),
+            Call(
+                strategy,
+                [func.strategy.balanceOfPool],
+                [[key + "balanceOfPool", None]],
+            ),
+            Call(
+                comptroller,
+                [func.comptroller.compAccrued, strategy],
+                [[key + "compAccrued", None]],
+            ),
+            Call(
+                comptroller,
+                [func.comptroller.markets, iToken],
+                [
+                    [key + "isListed", None],
+                    [key + "collateralFactor", None],
+                    [key + "isComped", None],
+                ],
+            ),
+        ]
+    return calls
+
+
+# ===== Pipeline =====
+
+
+def new_blocks(start=None, poll_interval=1.0):
+    """
+    Yields every block number from start onwards, waiting for new ones
+    """
+    block = web3.eth.block_number if start is None else start
+    while True:
+        head = web3.eth.block_number
+        while block <= head:
+            yield block
+            block += 1
+        time.sleep(poll_interval)
+
+
+def poll(strategies, blocks):
+    """
+    Yields (block, data) with every metric of every strategy, one eth_call a block
+    """
+    addresses = [getattr(strategy, "address", strategy) for strategy in strategies]
+    # One view reverting must not stop the tracker
+    plan = CallPlan(position_calls(addresses), require_success=False)
+    for block in blocks:
+        yield block, Multicall(plan, block_identifier=block)()
+
+
+def positions(snaps, labels):
+    """
+    Yields a DotMap per block of per strategy records, keyed by label
+    """
+    for block, data in snaps:
+        record = DotMap(block=block, strategies=DotMap())
+        for i, label in enumerate(labels):
+            key = str(i) + "."
+            position = DotMap(
+                {
+                    name: data[key + name]
+                    for name in (
+                        "supplys",
+                        "borrows",
+                        "collateralTarget",
+                        "collateralFactor",
+                        "balanceOfPool",
+                        "compAccrued",
+                    )
+                }
+            )
+            if position.supplys is CALL_FAILED or position.borrows is CALL_FAILED:
+                position.ratio = CALL_FAILED
+            else:
+                ## borrow / supply, scaled by 1e18 like collateralTarget
+                position.ratio = (
+                    position.borrows * ONE // position.supplys
+                    if position.supplys
+                    else 0
+                )
+            record.strategies[label] = position
+        yield record
+
+
+class RollingWindow:
+    """
+    Mean, min and max of the last size values, O(1) amortized per push
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.values = deque(maxlen=size)
+        self.total = 0
+        # Monotonic deques of (index, value) for min / max
+        self.mins = deque()
+        self.maxs = deque()
+        self.count = 0
+
+    def push(self, value):
+        if len(self.values) == self.size:
+            self.total -= self.values[0]
+        self.values.append(value)
+        self.total += value
+
+        index = self.count
+        self.count += 1
+        while self.mins and self.mins[-1][1] >= value:
+            self.mins.pop()
+        self.mins.append((index, value))
+        while self.maxs and self.maxs[-1][1] <= value:
+            self.maxs.pop()
+        self.maxs.append((index, value))
+        for extremes in (self.mins, self.maxs):
+            while extremes[0][0] <= index - self.size:
+                extremes.popleft()
+
+    def stats(self):
+        return DotMap(
+            last=self.values[-1],
+            mean=self.total // len(self.values),
+            min=self.mins[0][1],
+            max=self.maxs[0][1],
+            # Change over the window
+            delta=self.values[-1] - self.values[0],
+        )
+
+
+def rolling(records, window):
+    """
+    Adds record.strategies[label].rolling[metric] window stats
+    Failed reads are left out of the window
+    """
+    windows = {}
+    for record in records:
+        for label, position in record.strategies.items():
+            for metric in METRICS:
+                value = position[metric]
+                if value is CALL_FAILED:
+                    continue
+                key = (label, metric)
+                if key not in windows:
+                    windows[key] = RollingWindow(window)
+                windows[key].push(value)
+                position.rolling[metric] = windows[key].stats()
+        yield record
+
+
+def ratio_level(position, margin):
+    if position.ratio is CALL_FAILED or position.collateralFactor is CALL_FAILED:
+        return None
+    if position.ratio + margin >= position.collateralFactor:
+        return "nearCollateralFactor"
+    if position.ratio > position.collateralTarget:
+        return "aboveTarget"
+    return "ok"
+
+
+def threshold_events(records, margin=COLLATERAL_FACTOR_MARGIN):
+    """
+    Adds record.events, one event each time a strategy's ratio level changes:
+    ok, aboveTarget (over collateralTarget) or nearCollateralFactor (within
+    margin of the comptroller's collateral factor)
+    """
+    levels = {}
+    for record in records:
+        record.events = []
+        for label, position in record.strategies.items():
+            level = ratio_level(position, margin)
+            previous = levels.get(label, "ok")
+            if level is None or level == previous:
+                continue
+            record.events.append(
+                DotMap(
+                    block=record.block,
+                    strategy=label,
+                    level=level,
+                    previous=previous,
+                    ratio=position.ratio,
+                    collateralTarget=position.collateralTarget,
+                    collateralFactor=position.collateralFactor,
+                )
+            )
+            levels[label] = level
+        yield record
+
+
+def track(
+    strategies,
+    window=100,
+    margin=COLLATERAL_FACTOR_MARGIN,
+    start=None,
+    poll_interval=1.0,
+    blocks=None,
+):
+    """
+    Full pipeline over strategies, following the chain head unless blocks is given
+    Strategies are labelled by address
+    """
+    labels = [getattr(strategy, "address", strategy) for strategy in strategies]
+    if blocks is None:
+        blocks = new_blocks(start, poll_interval)
+    records = positions(poll(strategies, blocks), labels)
+    return threshold_events(rolling(records, window), margin)
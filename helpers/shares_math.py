@@ -1,3 +1,4 @@
+import numpy as np
 from dotmap import DotMap
 """
   Set of functions to calculate shares burned, fees, and want withdrawn or deposited
@@ -161,3 +162,166 @@ def get_report_fees(
         shares_management=shares_management,
         shares_perf_strategist=shares_perf_strategist,
     )
+
+
+"""
+  Batch variants
+  Same math on arrays, every argument broadcasts against the others.
+  Values are object-dtype arrays of Python ints, so // floors exactly like
+  Solidity on uint256, with no int64 overflow and no float rounding.
+"""
+
+
+def as_uint_array(values):
+    """
+    Object-dtype array of exact Python ints, rejects floats
+    """
+    array = np.array(values, dtype=object)
+    for value in array.flat:
+        if not isinstance(value, (int, np.integer)) or isinstance(value, bool):
+            raise TypeError("Expected integers, got {!r}".format(value))
+    return np.array(np.frompyfunc(int, 1, 1)(array), dtype=object)
+
+
+def as_uint_arrays(*values):
+    """
+    as_uint_array of every argument, broadcast to one shape and writable
+    """
+    arrays = np.broadcast_arrays(*[as_uint_array(value) for value in values])
+    return [np.array(array, dtype=object) for array in arrays]
+
+
+def from_want_to_shares_batch(
+    want_deposited, total_supply_before_deposit, balance_before_deposit
+):
+    """
+    Array version of from_want_to_shares
+    """
+    return from_want_to_shares(
+        *as_uint_arrays(
+            want_deposited,
+            total_supply_before_deposit,
+            balance_before_deposit,
+        )
+    )
+
+
+def from_shares_to_want_batch(shares_to_burn, ppfs_before_withdraw, vault_decimals):
+    """
+    Array version of from_shares_to_want
+    """
+    return from_shares_to_want(
+        *as_uint_arrays(
+            shares_to_burn,
+            ppfs_before_withdraw,
+            vault_decimals,
+        )
+    )
+
+
+def get_withdrawal_fees_in_want_batch(
+    shares_to_burn, ppfs_before_withdraw, vault_decimals, withdrawal_fee_bps
+):
+    """
+    Array version of get_withdrawal_fees_in_want
+    """
+    return get_withdrawal_fees_in_want(
+        *as_uint_arrays(
+            shares_to_burn,
+            ppfs_before_withdraw,
+            vault_decimals,
+            withdrawal_fee_bps,
+        )
+    )
+
+
+def get_withdrawal_fees_in_shares_batch(
+    shares_to_burn,
+    ppfs_before_withdraw,
+    vault_decimals,
+    withdrawal_fee_bps,
+    total_supply_before_withdraw,
+    vault_balance_before_withdraw,
+):
+    """
+    Array version of get_withdrawal_fees_in_shares
+    """
+    return get_withdrawal_fees_in_shares(
+        *as_uint_arrays(
+            shares_to_burn,
+            ppfs_before_withdraw,
+            vault_decimals,
+            withdrawal_fee_bps,
+            total_supply_before_withdraw,
+            vault_balance_before_withdraw,
+        )
+    )
+
+
+def get_performance_fees_want_batch(total_harvest_gain, performance_fee):
+    """
+    Array version of get_performance_fees_want
+    """
+    return get_performance_fees_want(
+        *as_uint_arrays(
+            total_harvest_gain,
+            performance_fee,
+        )
+    )
+
+
+def get_management_fees_want_batch(total_assets, time_passed, management_fee):
+    """
+    Array version of get_management_fees_want
+    """
+    return get_management_fees_want(
+        *as_uint_arrays(
+            total_assets,
+            time_passed,
+            management_fee,
+        )
+    )
+
+
+def get_performance_fees_shares_batch(
+    total_harvest_gain,
+    performance_fee,
+    total_supply_before_deposit,
+    balance_before_deposit,
+):
+    """
+    Array version of get_performance_fees_shares
+    """
+    return get_performance_fees_shares(
+        *as_uint_arrays(
+            total_harvest_gain,
+            performance_fee,
+            total_supply_before_deposit,
+            balance_before_deposit,
+        )
+    )
+
+
+def get_report_fees_batch(
+    total_harvest_gain,
+    performance_fee_treasury,
+    performance_fee_strategist,
+    management_fee,
+    time_since_last_harvest,
+    total_supply_before_deposit,
+    balance_before_deposit,
+):
+    """
+    Array version of get_report_fees, every field of the DotMap is an array
+    """
+    return get_report_fees(
+        *as_uint_arrays(
+            total_harvest_gain,
+            performance_fee_treasury,
+            performance_fee_strategist,
+            management_fee,
+            time_since_last_harvest,
+            total_supply_before_deposit,
+            balance_before_deposit,
+        )
+    )
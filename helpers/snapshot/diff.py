@@ -0,0 +1,175 @@
+import json
+import re
+
+import numpy as np
+
+from helpers.multicall import CALL_FAILED
+
+"""
+Snap diffs as a structured change set
+
+Snaps from the same call plan share a SnapSchema, so their values line up
+index by index and one elementwise comparison finds every change. Only the
+changed entries are then looked at one by one.
+"""
+
+# Stands in for a key the other snap doesn't have
+MISSING = None
+
+
+def object_array(values):
+    # Filling an empty array keeps list values (e.g. address[]) as single objects
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+
+def is_number(value):
+    return type(value) is int
+
+
+def delta(before, after):
+    if is_number(before) and is_number(after):
+        return after - before
+    return None
+
+
+class SnapDiff:
+    """
+    Changed keys between two snaps, with before, after and delta (after - before,
+    None when either side isn't a number)
+    """
+
+    def __init__(self, keys, before, after, deltas, beforeBlock=None, afterBlock=None):
+        self.keys = keys
+        self.before = before
+        self.after = after
+        self.deltas = deltas
+        self.beforeBlock = beforeBlock
+        self.afterBlock = afterBlock
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __iter__(self):
+        return iter(self.rows())
+
+    def rows(self):
+        """
+        (key, before, after, delta) for every change
+        """
+        return list(zip(self.keys, self.before, self.after, self.deltas))
+
+    def select(self, mask):
+        indices = [i for i, keep in enumerate(mask) if keep]
+        return SnapDiff(
+            [self.keys[i] for i in indices],
+            [self.before[i] for i in indices],
+            [self.after[i] for i in indices],
+            [self.deltas[i] for i in indices],
+            self.beforeBlock,
+            self.afterBlock,
+        )
+
+    def filter(self, keys=None, threshold=None, relativeBps=None):
+        """
+        keys: a regex searched in every key, or a predicate on it
+        threshold: numeric changes with abs(delta) under it are dropped
+        relativeBps: numeric changes under abs(delta / before) in bps are dropped
+        Non numeric changes are only subject to keys
+        """
+        if isinstance(keys, str):
+            pattern = re.compile(keys)
+            keys = pattern.search
+        mask = []
+        for key, before, _, change in self.rows():
+            keep = keys is None or bool(keys(key))
+            if keep and change is not None:
+                if threshold is not None and abs(change) < threshold:
+                    keep = False
+                if relativeBps is not None and before:
+                    keep = keep and abs(change) * 10_000 >= relativeBps * abs(before)
+            mask.append(keep)
+        return self.select(mask)
+
+    def to_dicts(self):
+        return [
+            {
+                "key": key,
+                "before": json_value(before),
+                "after": json_value(after),
+                "delta": change,
+            }
+            for key, before, after, change in self.rows()
+        ]
+
+    def to_json(self, **kwargs):
+        return json.dumps(
+            {
+                "beforeBlock": self.beforeBlock,
+                "afterBlock": self.afterBlock,
+                "changes": self.to_dicts(),
+            },
+            **kwargs,
+        )
+
+
+def json_value(value):
+    if value is CALL_FAILED:
+        return "CallFailed"
+    return value
+
+
+def diff_values(keys, before, after):
+    """
+    Changes between two value lists aligned on keys
+    """
+    before = object_array(before)
+    after = object_array(after)
+    changed = np.flatnonzero(before != after)
+    return (
+        [keys[i] for i in changed],
+        list(before[changed]),
+        list(after[changed]),
+        [delta(before[i], after[i]) for i in changed],
+    )
+
+
+def diff_snaps(before, after):
+    """
+    SnapDiff of two snaps, in before's key order with after-only keys last
+    """
+    if before.schema is after.schema:
+        keys = list(before.schema.keys)
+        afterValues = after.values
+    else:
+        # Different call plans, line after up with before's keys
+        keys = list(before.schema.keys)
+        index = after.schema.index
+        afterValues = [
+            after.values[index[key]] if key in index else MISSING for key in keys
+        ]
+        keys += [key for key in after.schema.keys if key not in before.schema.index]
+        afterValues += [after.values[index[key]] for key in keys[len(afterValues) :]]
+    beforeValues = list(before.values) + [MISSING] * (len(keys) - len(before.values))
+
+    changes = diff_values(keys, beforeValues, afterValues)
+
+    # Keys set() outside of the schemas are few, compare them one by one
+    extraKeys = set(before.extra or ()) | set(after.extra or ())
+    if extraKeys:
+        beforeData = before.data
+        afterData = after.data
+        for key in sorted(extraKeys):
+            if key in changes[0]:
+                # Compared above against a MISSING stand-in, redo it on the data
+                i = changes[0].index(key)
+                for column in changes:
+                    del column[i]
+            a = beforeData.get(key, MISSING)
+            b = afterData.get(key, MISSING)
+            if a != b:
+                for column, value in zip(changes, (key, a, b, delta(a, b))):
+                    column.append(value)
+
+    return SnapDiff(*changes, beforeBlock=before.block, afterBlock=after.block)
@@ -0,0 +1,72 @@
+import shelve
+from collections import OrderedDict
+
+
+class SnapHistory:
+    """
+    Snaps keyed by block, used as SnapshotManager.snaps
+
+    Keeps at most maxSnaps in memory, evicting the least recently used.
+    With a spillPath, evicted snaps are written to an on-disk shelve and
+    read back lazily the next time their block is asked for.
+    maxSnaps=None keeps everything in memory, like a plain dict.
+    """
+
+    def __init__(self, maxSnaps=None, spillPath=None):
+        self.maxSnaps = maxSnaps
+        self.memory = OrderedDict()
+        self.store = shelve.open(spillPath, flag="n") if spillPath else None
+
+    def __setitem__(self, block, snap):
+        self.memory[block] = snap
+        self.memory.move_to_end(block)
+        self.evict()
+
+    def __getitem__(self, block):
+        if block in self.memory:
+            self.memory.move_to_end(block)
+            return self.memory[block]
+        if self.store is not None and str(block) in self.store:
+            snap = self.store[str(block)]
+            self[block] = snap
+            return snap
+        raise KeyError(block)
+
+    def __contains__(self, block):
+        return block in self.memory or (
+            self.store is not None and str(block) in self.store
+        )
+
+    def __len__(self):
+        return len(self.blocks())
+
+    def __iter__(self):
+        return iter(self.blocks())
+
+    def get(self, block, default=None):
+        try:
+            return self[block]
+        except KeyError:
+            return default
+
+    def blocks(self):
+        """
+        Every block with a snap, in memory or spilled, in ascending order
+        """
+        blocks = set(self.memory)
+        if self.store is not None:
+            blocks.update(int(block) for block in self.store.keys())
+        return sorted(blocks)
+
+    def evict(self):
+        if self.maxSnaps is None:
+            return
+        while len(self.memory) > self.maxSnaps:
+            block, snap = self.memory.popitem(last=False)
+            if self.store is not None:
+                self.store[str(block)] = snap
+
+    def close(self):
+        if self.store is not None:
+            self.store.close()
+            self.store = None
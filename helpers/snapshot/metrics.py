@@ -0,0 +1,284 @@
+import json
+import os
+from bisect import bisect_left
+
+from tabulate import tabulate
+
+"""
+Per-snap timing and RPC metrics, sent to pluggable sinks
+
+Every SnapshotManager.snap / snapUsers emits one metrics dict: the Multicall
+stats (calls, chunks, rpcs, bytes, encode / rpc / decode time), the time spent
+building the call plan, the total time and the block. A sink is anything with
+emit(metrics), SnapshotManager sends to the module sinks list by default.
+
+Names carry their unit (_seconds, _bytes), plain counts have none. Sinks that
+aggregate keep a fixed-bucket histogram per metric and kind, so their size and
+the cost of an emit don't grow with the number of snaps.
+"""
+
+# Multicall stats name -> metric name
+STAT_NAMES = {
+    "calls": "calls",
+    "chunks": "chunks",
+    "rpcs": "rpcs",
+    "bytes_sent": "sent_bytes",
+    "bytes_received": "received_bytes",
+    "encode_time": "encode_seconds",
+    "rpc_time": "rpc_seconds",
+    "decode_time": "decode_seconds",
+}
+FIELDS = ("plan_seconds", "snap_seconds") + tuple(STAT_NAMES.values())
+QUANTILES = (0.5, 0.9, 0.99)
+
+# Upper bounds of the histogram buckets, a last +Inf bucket takes the rest
+SECONDS_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+BYTES_BUCKETS = tuple(float(4 ** i) for i in range(4, 13))
+COUNT_BUCKETS = (1.0, 2.0, 5.0, 10.0, 20.0, 50.0, 100.0, 200.0, 500.0, 1000.0, 5000.0)
+
+
+def buckets(field):
+    if field.endswith("_seconds"):
+        return SECONDS_BUCKETS
+    if field.endswith("_bytes"):
+        return BYTES_BUCKETS
+    return COUNT_BUCKETS
+
+
+def snap_metrics(kind, key, block, multi, planTime, time):
+    metrics = {STAT_NAMES[name]: value for name, value in multi.stats.items()}
+    metrics.update(
+        kind=kind,
+        key=key,
+        block=block,
+        plan_seconds=planTime,
+        snap_seconds=time,
+    )
+    # Building the plan is the encoding work of a snap, the aggregate calldata
+    # is compiled into it
+    metrics["encode_seconds"] += planTime
+    return metrics
+
+
+class Histogram:
+    """
+    Count, sum, max and per-bucket counts of the observed values
+    """
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        # Bucket i holds bounds[i - 1] < value <= bounds[i]
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def cumulative(self):
+        """
+        (upper bound, values <= it) of every bucket, the last bound is inf
+        """
+        total = 0
+        rows = []
+        for bound, count in zip(self.bounds + (float("inf"),), self.counts):
+            total += count
+            rows.append((bound, total))
+        return rows
+
+    def quantile(self, q):
+        """
+        Estimate, interpolated within the bucket the q-th value falls in
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        lower, below = 0.0, 0
+        for bound, total in self.cumulative():
+            if total >= rank and total > below:
+                upper = min(bound, self.max)
+                lower = min(lower, upper)
+                return lower + (upper - lower) * (rank - below) / (total - below)
+            lower, below = bound, total
+        return self.max
+
+    def state(self):
+        return {
+            "counts": self.counts,
+            "count": self.count,
+            "sum": self.sum,
+            "max": self.max,
+        }
+
+    def merge(self, state):
+        for i, count in enumerate(state["counts"]):
+            self.counts[i] += count
+        self.count += state["count"]
+        self.sum += state["sum"]
+        self.max = max(self.max, state["max"])
+
+
+class MemorySink:
+    """
+    Histogram of every field per kind, summarised as count / sum / quantiles
+    """
+
+    def __init__(self):
+        # {(field, kind): Histogram}
+        self.histograms = {}
+
+    def __len__(self):
+        return sum(
+            histogram.count
+            for (field, _), histogram in self.histograms.items()
+            if field == "snap_seconds"
+        )
+
+    def histogram(self, field, kind):
+        histogram = self.histograms.get((field, kind))
+        if histogram is None:
+            histogram = self.histograms[(field, kind)] = Histogram(buckets(field))
+        return histogram
+
+    def emit(self, metrics):
+        kind = metrics["kind"]
+        for field in FIELDS:
+            self.histogram(field, kind).observe(metrics[field])
+
+    def state(self):
+        """
+        {field: {kind: histogram state}}, plain dicts to send across processes
+        """
+        state = {}
+        for (field, kind), histogram in self.histograms.items():
+            state.setdefault(field, {})[kind] = histogram.state()
+        return state
+
+    def merge(self, state):
+        """
+        Adds the state() of another MemorySink, e.g. from an xdist worker
+        """
+        for field, kinds in state.items():
+            for kind, histogramState in kinds.items():
+                self.histogram(field, kind).merge(histogramState)
+
+    def summary(self):
+        """
+        {(field, kind): {count, sum, mean, max, quantiles}}
+        Quantiles are estimated from the buckets
+        """
+        summary = {}
+        for key, histogram in self.histograms.items():
+            summary[key] = {
+                "count": histogram.count,
+                "sum": histogram.sum,
+                "mean": histogram.sum / histogram.count if histogram.count else 0.0,
+                "max": histogram.max,
+                "quantiles": {q: histogram.quantile(q) for q in QUANTILES},
+            }
+        return summary
+
+    def print(self):
+        table = []
+        for (field, kind), stats in sorted(self.summary().items()):
+            table.append(
+                [kind, field, stats["count"], stats["sum"], stats["mean"]]
+                + [stats["quantiles"][q] for q in QUANTILES]
+                + [stats["max"]]
+            )
+        print(
+            tabulate(
+                table,
+                headers=["kind", "metric", "count", "sum", "mean"]
+                + ["p" + str(int(q * 100)) for q in QUANTILES]
+                + ["max"],
+                tablefmt="grid",
+            )
+        )
+
+
+class JsonLinesSink:
+    """
+    Appends every metrics dict as a line of JSON
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def emit(self, metrics):
+        with open(self.path, "a") as f:
+            f.write(json.dumps(metrics) + "\n")
+
+
+class PrometheusSink:
+    """
+    Rewrites a Prometheus text format file after every emit, one histogram per
+    field, for a node exporter textfile collector to pick up
+    """
+
+    def __init__(self, path, prefix="snapshot"):
+        self.path = path
+        self.prefix = prefix
+        self.memory = MemorySink()
+
+    def emit(self, metrics):
+        self.memory.emit(metrics)
+        self.write()
+
+    def lines(self):
+        lines = []
+        histograms = self.memory.histograms
+        for field in FIELDS:
+            name = "{}_{}".format(self.prefix, field)
+            kinds = sorted(kind for f, kind in histograms if f == field)
+            if not kinds:
+                continue
+            lines.append("# TYPE {} histogram".format(name))
+            for kind in kinds:
+                histogram = histograms[(field, kind)]
+                for bound, total in histogram.cumulative():
+                    lines.append(
+                        '{}_bucket{{kind="{}",le="{}"}} {}'.format(
+                            name,
+                            kind,
+                            "+Inf" if bound == float("inf") else bound,
+                            total,
+                        )
+                    )
+                lines.append('{}_sum{{kind="{}"}} {}'.format(name, kind, histogram.sum))
+                lines.append(
+                    '{}_count{{kind="{}"}} {}'.format(name, kind, histogram.count)
+                )
+        return lines
+
+    def write(self):
+        # Written aside then moved, a scrape never reads half a file
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            f.write("\n".join(self.lines()) + "\n")
+        os.replace(tmp, self.path)
+
+
+# Collects every snap of the process, printed at the end of the pytest session
+session = MemorySink()
+sinks = [session]
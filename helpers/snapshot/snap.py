@@ -1,23 +1,108 @@
+import sys
+
+from helpers.multicall import CALL_FAILED
+
+
+class SnapSchema:
+    """
+    Ordered, interned metric keys shared by every Snap with the same key set
+    Snaps only keep their values, in schema order
+    """
+
+    __slots__ = ("keys", "index")
+
+    # One schema per key set, i.e. per snapshot call plan
+    _schemas = {}
+
+    def __init__(self, keys):
+        self.keys = tuple(sys.intern(key) for key in keys)
+        self.index = {key: i for i, key in enumerate(self.keys)}
+
+    @classmethod
+    def for_keys(cls, keys):
+        keys = tuple(keys)
+        schema = cls._schemas.get(keys)
+        if schema is None:
+            schema = cls._schemas[keys] = cls(keys)
+        return schema
+
+
 class Snap:
-    def __init__(self, data, block, entityKeys):
-        self.data = data
+    __slots__ = ("schema", "values", "extra", "block", "entityKeys", "aggregateBlock")
+
+    def __init__(self, data, block, entityKeys, aggregateBlock=None):
+        self.schema = SnapSchema.for_keys(data.keys())
+        self.values = list(data.values())
+        # Keys set() outside of the schema
+        self.extra = None
         self.block = block
         self.entityKeys = entityKeys
+        # Block number reported by the multicall aggregate
+        self.aggregateBlock = aggregateBlock
+
+    def __getstate__(self):
+        return (
+            self.schema.keys,
+            self.values,
+            self.extra,
+            self.block,
+            self.entityKeys,
+            self.aggregateBlock,
+        )
+
+    def __setstate__(self, state):
+        keys, self.values, self.extra, self.block, self.entityKeys = state[:5]
+        self.aggregateBlock = state[5]
+        # Share the interned schema again rather than one copy per loaded snap
+        self.schema = SnapSchema.for_keys(keys)
+
+    @property
+    def data(self):
+        """
+        Every metric as a dict, built on access
+        """
+        data = dict(zip(self.schema.keys, self.values))
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def items(self):
+        yield from zip(self.schema.keys, self.values)
+        if self.extra:
+            yield from self.extra.items()
 
     # ===== Getters =====
 
     def balances(self, tokenKey, accountKey):
-        return self.data["balances." + tokenKey + "." + accountKey]
+        return self.get("balances." + tokenKey + "." + accountKey)
 
     def shares(self, tokenKey, accountKey):
-        return self.data["shares." + tokenKey + "." + accountKey]
+        return self.get("shares." + tokenKey + "." + accountKey)
 
     def get(self, key):
-        if key not in self.data.keys():
-            raise Exception("Key {} not found in snap data".format(key))
-        return self.data[key]
+        i = self.schema.index.get(key)
+        if i is not None:
+            return self.values[i]
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise Exception("Key {} not found in snap data".format(key))
+
+    def failed(self):
+        """
+        Keys whose call failed, their value is CALL_FAILED
+        """
+        return [key for key, value in self.items() if value is CALL_FAILED]
+
+    def has(self, key):
+        return key in self.schema.index or bool(self.extra and key in self.extra)
 
     # ===== Setters =====
 
     def set(self, key, value):
-        self.data[key] = value
+        i = self.schema.index.get(key)
+        if i is not None:
+            self.values[i] = value
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
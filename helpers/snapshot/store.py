@@ -0,0 +1,192 @@
+"""
+Append-only columnar store of snaps, one row per block and one file per metric
+
+<path>/keys.json     metric keys, in column creation order
+<path>/blocks.col    uint64 block number of every row, ascending
+<path>/<key>.col     one COLUMN_DTYPE record per row
+
+uint256 values are kept as 4 little-endian uint64 limbs (limb 0 lowest),
+with a valid flag cleared for missing or failed (CALL_FAILED) values.
+Reads are zero-copy numpy memmap views.
+"""
+
+import json
+import os
+
+import numpy as np
+
+BLOCK_DTYPE = np.dtype("<u8")
+COLUMN_DTYPE = np.dtype([("limbs", "<u8", (4,)), ("valid", "u1")])
+LIMB_BITS = 64
+LIMB_MASK = 2 ** LIMB_BITS - 1
+UINT256_MODULUS = 2 ** 256
+
+
+def to_record(value):
+    """
+    Snap value to a (limbs, valid) record
+    bools and addresses are stored as their integer value
+    Negative or over 256 bit ints don't fit a uint256 record and are raised
+    """
+    if isinstance(value, str) and value.startswith("0x"):
+        value = int(value, 16)
+    if type(value) not in (int, bool):
+        return (0, 0, 0, 0), 0
+    value = int(value)
+    if not 0 <= value < UINT256_MODULUS:
+        raise ValueError("{} doesn't fit a uint256 column".format(value))
+    return tuple((value >> (LIMB_BITS * i)) & LIMB_MASK for i in range(4)), 1
+
+
+def limbs_to_int(limbs):
+    """
+    (..., 4) limb array to an object array of exact Python ints
+    """
+    limbs = np.asarray(limbs)
+    result = np.zeros(limbs.shape[:-1], dtype=object)
+    for i in range(4):
+        result += limbs[..., i].astype(object) << (LIMB_BITS * i)
+    return result
+
+
+def limbs_to_float(limbs):
+    """
+    (..., 4) limb array to float64, fine for plotting and ratios, not for equality
+    """
+    scale = np.array([2.0 ** (LIMB_BITS * i) for i in range(4)])
+    return np.asarray(limbs, dtype=np.float64) @ scale
+
+
+def _memmap(path, dtype):
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        # np.memmap refuses empty files
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r")
+
+
+class SnapStore:
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.keys = []
+        keysPath = os.path.join(path, "keys.json")
+        if os.path.exists(keysPath):
+            with open(keysPath) as f:
+                self.keys = json.load(f)
+
+    # ===== Layout =====
+
+    def column_path(self, key):
+        return os.path.join(self.path, key + ".col")
+
+    def blocks_path(self):
+        return os.path.join(self.path, "blocks.col")
+
+    def save_keys(self):
+        with open(os.path.join(self.path, "keys.json"), "w") as f:
+            json.dump(self.keys, f)
+
+    # ===== Writer =====
+
+    def rows(self):
+        if not os.path.exists(self.blocks_path()):
+            return 0
+        return os.path.getsize(self.blocks_path()) // BLOCK_DTYPE.itemsize
+
+    def truncate(self, rows):
+        """
+        Drops every row from rows onwards
+        """
+        os.truncate(self.blocks_path(), rows * BLOCK_DTYPE.itemsize)
+        for key in self.keys:
+            os.truncate(self.column_path(key), rows * COLUMN_DTYPE.itemsize)
+
+    def add_column(self, key, rows):
+        # Rows written before the key existed are not valid
+        with open(self.column_path(key), "wb") as f:
+            f.write(np.zeros(rows, dtype=COLUMN_DTYPE).tobytes())
+        self.keys.append(key)
+
+    def append(self, snap, rewind=False):
+        """
+        Appends a snap as the row for snap.block
+
+        Blocks must come in ascending order. With rewind, a snap at or before
+        the last row drops every row from snap.block on first, so re-snapping
+        a block overwrites it and a chain.revert() discards the reverted
+        history. Without it such a snap is raised and nothing is dropped.
+        """
+        blocks = self.blocks()
+        rows = int(np.searchsorted(blocks, snap.block, side="left"))
+        last = int(blocks[-1]) if len(blocks) else None
+        del blocks
+        if rows < self.rows():
+            if not rewind:
+                raise ValueError(
+                    "Snap at block {} is not after the last stored block {}".format(
+                        snap.block, last
+                    )
+                )
+            self.truncate(rows)
+
+        values = dict(snap.items())
+        # Checked before anything is written, a bad value leaves no partial row
+        records = {key: to_record(value) for key, value in values.items()}
+        newKeys = [key for key in values if key not in self.keys]
+        for key in newKeys:
+            self.add_column(key, rows)
+        if newKeys:
+            self.save_keys()
+
+        with open(self.blocks_path(), "ab") as f:
+            f.write(np.array([snap.block], dtype=BLOCK_DTYPE).tobytes())
+        for key in self.keys:
+            record = np.array([records.get(key, ((0, 0, 0, 0), 0))], dtype=COLUMN_DTYPE)
+            with open(self.column_path(key), "ab") as f:
+                f.write(record.tobytes())
+
+    # ===== Reader =====
+
+    def blocks(self):
+        return _memmap(self.blocks_path(), BLOCK_DTYPE)
+
+    def row_range(self, startBlock=None, endBlock=None):
+        """
+        [start, end) rows of blocks within [startBlock, endBlock]
+        """
+        blocks = self.blocks()
+        start = 0
+        end = len(blocks)
+        if startBlock is not None:
+            start = np.searchsorted(blocks, startBlock, "left")
+        if endBlock is not None:
+            end = np.searchsorted(blocks, endBlock, "right")
+        return int(start), int(end)
+
+    def column(self, key, startBlock=None, endBlock=None):
+        """
+        Zero-copy COLUMN_DTYPE view of a metric over a block range
+        """
+        if key not in self.keys:
+            raise Exception("Key {} not found in snap store".format(key))
+        start, end = self.row_range(startBlock, endBlock)
+        return _memmap(self.column_path(key), COLUMN_DTYPE)[start:end]
+
+    def limbs(self, key, startBlock=None, endBlock=None):
+        """
+        (rows, 4) uint64 limb view of a metric over a block range
+        """
+        return self.column(key, startBlock, endBlock)["limbs"]
+
+    def valid(self, key, startBlock=None, endBlock=None):
+        return self.column(key, startBlock, endBlock)["valid"].astype(bool)
+
+    def series(self, key, startBlock=None, endBlock=None):
+        """
+        (blocks, exact int values) of a metric, copies out of the memmap
+        """
+        start, end = self.row_range(startBlock, endBlock)
+        return (
+            np.array(self.blocks()[start:end]),
+            limbs_to_int(self.limbs(key, startBlock, endBlock)),
+        )
@@ -0,0 +1,105 @@
+import csv
+import json
+
+import numpy as np
+
+from helpers.multicall import CALL_FAILED
+
+"""
+Per-user columnar snapshot of a sett holder base
+
+One row per user, one object array of exact ints per column, all read at the
+same block. Failed reads are CALL_FAILED and left out of totals.
+"""
+
+COLUMNS = ("want", "shares", "value")
+
+
+def json_value(value):
+    return None if value is CALL_FAILED else value
+
+
+class UserSnap:
+    def __init__(self, users, keys, want, shares, block, ppfs, totalSupply, decimals):
+        self.users = list(users)
+        self.keys = list(keys)
+        self.want = np.array(want, dtype=object)
+        self.shares = np.array(shares, dtype=object)
+        self.block = block
+        self.ppfs = ppfs
+        self.totalSupply = totalSupply
+        self.decimals = decimals
+
+        valid = self.valid("shares")
+        if ppfs is CALL_FAILED:
+            # No share price, no user's value is known
+            valid[:] = False
+        # Want the shares are worth, before withdrawal fees
+        self.value = np.array(
+            [
+                shares * ppfs // 10 ** decimals if ok else CALL_FAILED
+                for shares, ok in zip(self.shares, valid)
+            ],
+            dtype=object,
+        )
+
+    def __len__(self):
+        return len(self.users)
+
+    def column(self, name):
+        if name not in COLUMNS:
+            raise Exception("Column {} not found in user snap".format(name))
+        return getattr(self, name)
+
+    def valid(self, name):
+        return np.array(
+            [value is not CALL_FAILED for value in getattr(self, name)], dtype=bool
+        )
+
+    def total(self, name):
+        column = self.column(name)
+        return sum(column[self.valid(name)])
+
+    def user(self, user):
+        """
+        Row of a user, by key or address
+        """
+        if user in self.keys:
+            i = self.keys.index(user)
+        else:
+            i = self.users.index(user)
+        return {name: self.column(name)[i] for name in COLUMNS}
+
+    def rows(self):
+        return [
+            [key, user] + [self.column(name)[i] for name in COLUMNS]
+            for i, (key, user) in enumerate(zip(self.keys, self.users))
+        ]
+
+    def to_csv(self, path):
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["key", "user"] + list(COLUMNS))
+            for row in self.rows():
+                writer.writerow(
+                    ["" if value is CALL_FAILED else value for value in row]
+                )
+
+    def to_json(self, **kwargs):
+        return json.dumps(
+            {
+                "block": self.block,
+                "ppfs": json_value(self.ppfs),
+                "totalSupply": json_value(self.totalSupply),
+                "users": [
+                    dict(
+                        zip(
+                            ["key", "user"] + list(COLUMNS),
+                            [json_value(value) for value in row],
+                        )
+                    )
+                    for row in self.rows()
+                ],
+            },
+            **kwargs
+        )
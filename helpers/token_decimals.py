@@ -0,0 +1,49 @@
+from helpers.multicall import Call, Multicall, CALL_FAILED, func
+from helpers.multicall.call import checksum_address
+
+"""
+  Token decimals, read once per token and cached for formatting
+"""
+
+DEFAULT_DECIMALS = 18
+
+
+class DecimalsRegistry:
+    def __init__(self):
+        self.decimals = {}
+
+    def resolve(self, tokens):
+        """
+        Fetches every unknown token's decimals in a single multicall
+        Tokens without a working decimals() are taken as DEFAULT_DECIMALS
+        """
+        tokens = [self.key(token) for token in tokens]
+        missing = sorted({token for token in tokens if token not in self.decimals})
+        if missing:
+            data = Multicall(
+                [
+                    Call(token, [func.erc20.decimals], [[token, None]])
+                    for token in missing
+                ],
+                require_success=False,
+            )()
+            for token in missing:
+                decimals = data[token]
+                self.decimals[token] = (
+                    DEFAULT_DECIMALS if decimals is CALL_FAILED else decimals
+                )
+        return [self.decimals[token] for token in tokens]
+
+    def key(self, token):
+        # Contracts or address strings, in any case
+        return checksum_address(str(getattr(token, "address", token)))
+
+    def get(self, token):
+        return self.resolve([token])[0]
+
+    def set(self, token, decimals):
+        self.decimals[self.key(token)] = decimals
+
+
+# Shared by every SnapshotManager and val() call
+registry = DecimalsRegistry()
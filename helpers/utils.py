@@ -1,3 +1,6 @@
+from helpers.token_decimals import registry
+
+
 # Assert approximate integer
 def approx(actual, expected, percentage_threshold):
     print(actual, expected, percentage_threshold)
@@ -21,7 +24,8 @@ def val(amount=0, decimals=18, token=None):
     # return amount
     # return "{:,.0f}".format(amount)
     # If no token specified, use decimals
+    # Token decimals are read once, then served from the registry
     if token:
-        decimals = interface.IERC20Detailed(token).decimals()
+        decimals = registry.get(token)
 
     return "{:,.18f}".format(amount / 10 ** decimals)
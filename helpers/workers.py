@@ -0,0 +1,33 @@
+"""
+  pytest-xdist helpers, for brownie test -n <workers>
+
+  brownie runs every xdist worker against its own chain: the network's port
+  is shifted by the worker number, so a fork network gets one ganache fork
+  per worker. Session state lives in each worker, so session reports are
+  sent back to the controller through workeroutput and merged there.
+"""
+
+
+def is_worker(config):
+    return hasattr(config, "workerinput")
+
+
+def worker_id(config):
+    """
+    gw0, gw1, ... on xdist workers, master otherwise
+    """
+    return config.workerinput["workerid"] if is_worker(config) else "master"
+
+
+def send(config, key, state):
+    """
+    Hands state (plain dicts, lists and numbers) from a worker to the controller
+    """
+    config.workeroutput[key] = state
+
+
+def received(node, key):
+    """
+    State a finished worker node sent under key, None if it sent nothing
+    """
+    return getattr(node, "workeroutput", {}).get(key)
@@ -0,0 +1,95 @@
+import timeit
+
+from eth_abi import encode_single, decode_single
+from eth_utils import function_signature_to_4byte_selector, to_checksum_address
+from rich.console import Console
+
+from helpers.multicall import Call, as_wei, func
+from helpers.multicall.signature import parse_signature
+
+console = Console()
+
+## Same shape as SnapshotManager.snap with the default entities + "user"
+ENTITIES = ["0x{:040x}".format(i) for i in range(1, 7)]
+TOKEN = "0x321162Cd933E2Be498Cd2267a90534A804051b11"
+SETT = "0x{:040x}".format(0x5E77)
+STRATEGY = "0x{:040x}".format(0x57A7)
+SETT_FUNCTIONS = [
+    func.sett.balance,
+    func.sett.available,
+    func.sett.getPricePerFullShare,
+    func.erc20.decimals,
+    func.erc20.totalSupply,
+    func.sett.withdrawalFee,
+    func.sett.managementFee,
+    func.sett.lastHarvestedAt,
+    func.sett.performanceFeeGovernance,
+    func.sett.performanceFeeStrategist,
+]
+STRATEGY_FUNCTIONS = [
+    func.strategy.balanceOfPool,
+    func.strategy.balanceOfWant,
+    func.strategy.balanceOf,
+    func.strategy.getTimelySupplyPosition,
+    func.strategy.getTimelyBorrowPosition,
+    func.strategy.collateralTarget,
+    func.strategy.minWant,
+]
+OUTPUT = encode_single("uint256", 10 ** 18)
+ROUNDS = 200
+
+
+def snap_calls():
+    calls = []
+    for token in [TOKEN, SETT]:
+        for entity in ENTITIES:
+            calls.append([token, [func.erc20.balanceOf, entity]])
+    calls += [[SETT, [function]] for function in SETT_FUNCTIONS]
+    calls += [[STRATEGY, [function]] for function in STRATEGY_FUNCTIONS]
+    return calls
+
+
+def legacy_snap(calls):
+    """
+    Call + Signature work per snap before the cache: parse, keccak, encode, decode
+    """
+    for target, (function, *args) in calls:
+        to_checksum_address(target)
+        parts = parse_signature(function)
+        fourbyte = function_signature_to_4byte_selector("".join(parts[:2]))
+        _ = fourbyte + encode_single(parts[1], args) if args else fourbyte
+        decode_single(parts[2], OUTPUT)
+
+
+def cached_snap(calls):
+    for target, function in calls:
+        call = Call(target, function, [["key", as_wei]])
+        _ = call.data
+        call.decode_output(OUTPUT)
+
+
+def main():
+    """
+    Micro-benchmark of the Python-side encoding overhead of one snap
+    Run with: python -m scripts.benchmark_signature_cache
+    """
+    calls = snap_calls()
+    cached_snap(calls)  # warm the signature cache
+
+    results = []
+    for name, run in [("legacy", legacy_snap), ("cached", cached_snap)]:
+        seconds = min(timeit.repeat(lambda: run(calls), number=ROUNDS, repeat=5))
+        results.append((name, seconds / ROUNDS * 1e6))
+
+    console.print(
+        "[green]=== Per-snap encoding overhead ({} calls) ===[/green]".format(
+            len(calls)
+        )
+    )
+    for name, micros in results:
+        console.print("{:>8}: {:,.1f} us".format(name, micros))
+    console.print("speedup: {:.2f}x".format(results[0][1] / results[1][1]))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+import os
 import time
 
 from brownie import (
@@ -5,7 +6,10 @@ from brownie import (
     TheVault,
     interface,
     accounts,
+    chain,
+    network,
 )
+from brownie.network import rpc
 from _setup.config import (
     WANT, 
     WHALE_ADDRESS,
@@ -15,6 +19,11 @@ from _setup.config import (
     MANAGEMENT_FEE,
 )
 from helpers.constants import MaxUint256
+from helpers.deployment_cache import DeploymentCache, config_hash
+from helpers import gas_trace
+from helpers.gas_report import GasReport, TOLERANCE_BPS
+from helpers.snapshot import metrics
+from helpers.workers import is_worker, worker_id, send, received
 from rich.console import Console
 
 console = Console()
@@ -24,87 +33,112 @@ import pytest
 
 
 ## Accounts ##
-@pytest.fixture
+@pytest.fixture(scope="session")
 def deployer():
     return accounts[0]
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def user():
     return accounts[9]
 
 
 ## Fund the account
-@pytest.fixture
-def want(deployer):
+@pytest.fixture(scope="session")
+def want(deployer, cachedDeployment):
     """
         TODO: Customize this so you have the token you need for the strat
     """
     TOKEN_ADDRESS = WANT
     token = interface.IERC20Detailed(TOKEN_ADDRESS)
+    if cachedDeployment:
+        ## Funded when the cached deployment was made
+        return token
     WHALE = accounts.at(WHALE_ADDRESS, force=True)  ## Address with tons of token
 
     token.transfer(deployer, token.balanceOf(WHALE), {"from": WHALE})
     return token
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def strategist():
     return accounts[1]
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def keeper():
     return accounts[2]
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def guardian():
     return accounts[3]
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def governance():
     return accounts[4]
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def treasury():
     return accounts[5]
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def proxyAdmin():
     return accounts[6]
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def randomUser():
     return accounts[7]
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def badgerTree():
     return accounts[8]
 
 
-@pytest.fixture
-def deployed(
-    want,
-    deployer,
-    strategist,
-    keeper,
-    guardian,
-    governance,
-    proxyAdmin,
-    randomUser,
-    badgerTree,
-):
+## Deployment ##
+# Deployed once per session (per worker with xdist), module_isolation and
+# isolation revert every module and test back to it. With a node that
+# outlives the run, the next run picks the deployment up from
+# DEPLOYMENT_CACHE instead of redoing it
+DEPLOYMENTS = DeploymentCache(
+    os.environ.get("DEPLOYMENT_CACHE", ".deployments/deployments.json")
+)
+
+
+@pytest.fixture(scope="session")
+def deploymentKey(pytestconfig):
+    return config_hash(
+        TheVault.bytecode,
+        MyStrategy.bytecode,
+        WANT,
+        WHALE_ADDRESS,
+        PERFORMANCE_FEE_GOVERNANCE,
+        PERFORMANCE_FEE_STRATEGIST,
+        WITHDRAWAL_FEE,
+        MANAGEMENT_FEE,
+        network.show_active(),
+        chain.id,
+        worker_id(pytestconfig),
+    )
+
+
+@pytest.fixture(scope="session")
+def cachedDeployment(deploymentKey):
     """
-    Deploys, vault and test strategy, mock token and wires them up.
+    {vault, strategy} addresses of a deployment still on the chain, or None
     """
-    want = want
+    return DEPLOYMENTS.get(deploymentKey)
 
+
+def deploy(want, deployer, strategist, keeper, guardian, governance, badgerTree):
+    """
+    Deploys, vault and test strategy and wires them up.
+    """
     vault = TheVault.deploy({"from": deployer})
     vault.initialize(
         want,
@@ -131,6 +165,38 @@ def deployed(
     # NOTE: Strategy starts unpaused
 
     vault.setStrategy(strategy, {"from": governance})
+    return vault, strategy
+
+
+@pytest.fixture(scope="session")
+def deployed(
+    want,
+    deployer,
+    strategist,
+    keeper,
+    guardian,
+    governance,
+    proxyAdmin,
+    randomUser,
+    badgerTree,
+    deploymentKey,
+    cachedDeployment,
+):
+    """
+    Deploys, vault and test strategy, mock token and wires them up.
+    """
+    want = want
+
+    if cachedDeployment:
+        vault = TheVault.at(cachedDeployment["vault"])
+        strategy = MyStrategy.at(cachedDeployment["strategy"])
+    else:
+        vault, strategy = deploy(
+            want, deployer, strategist, keeper, guardian, governance, badgerTree
+        )
+        DEPLOYMENTS.save(
+            deploymentKey, {"vault": vault.address, "strategy": strategy.address}
+        )
 
     return DotMap(
         deployer=deployer,
@@ -193,7 +259,128 @@ def setup_share_math(deployer, vault, want, governance):
     return DotMap(depositAmount=depositAmount)
 
 
+## Isolation ##
+def revert(snapshot):
+    """
+    Reverts to snapshot through chain._revert, which also resyncs the time
+    offset and prunes history and ContractContainers past the block
+    """
+    chain._revert(snapshot)
+
+
+# Replaces brownie's module_isolation, which would chain.reset() every module
+# and drop the session deployment. This one sits on top of the deployment and
+# reverts every module back to it. brownie test -n needs every test to use a
+# fixture of that name, isolation below gives it to all of them
+@pytest.fixture(scope="module")
+def module_isolation(deployed):
+    snapshot = rpc.Rpc().snapshot()
+    yield
+    revert(snapshot)
+
+
 ## Forces reset before each test
+# The ids are kept here rather than through chain.snapshot(), which tests use
+# themselves
 @pytest.fixture(autouse=True)
-def isolation(fn_isolation):
-    pass
+def isolation(module_isolation):
+    snapshot = rpc.Rpc().snapshot()
+    yield
+    revert(snapshot)
+
+
+## Session reports ##
+# Under brownie test -n <workers> every worker has its own copy of these, the
+# workers send them to the controller, which merges and reports them once
+
+## Gas benchmarks (tests/gas)
+# Marked gas and skipped unless run with -m gas or GAS_BENCHMARK=1
+# GAS_REPORT_DIR      where gas.json / gas.csv are written (reports/gas)
+# GAS_BASELINE        baseline gas.json to compare with (tests/gas/gas_baseline.json)
+# GAS_TOLERANCE_BPS   allowed increase over the baseline (200)
+# GAS_WRITE_BASELINE  set to 1 to record this run as GAS_BASELINE
+# A benchmark run without a baseline records itself as GAS_BASELINE and fails
+# once, commit the file it writes so the next runs are checked against it
+GAS_REPORT = GasReport()
+GAS_REPORT_DIR = os.environ.get("GAS_REPORT_DIR", "reports/gas")
+GAS_BASELINE = os.environ.get(
+    "GAS_BASELINE",
+    os.path.join(os.path.dirname(__file__), "gas", "gas_baseline.json"),
+)
+GAS_TOLERANCE = int(os.environ.get("GAS_TOLERANCE_BPS", TOLERANCE_BPS))
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "gas: gas benchmarks, run with -m gas or GAS_BENCHMARK=1"
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    if os.environ.get("GAS_BENCHMARK") or "gas" in (config.getoption("markexpr") or ""):
+        return
+    skip = pytest.mark.skip(reason="gas benchmark, run with -m gas")
+    for item in items:
+        if "gas" in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture(scope="session")
+def gas_report():
+    return GAS_REPORT
+
+
+def check_gas_report():
+    """
+    Writes the gas report, returns False when it regressed over the baseline
+    or there was no baseline to check it against
+    """
+    GAS_REPORT.write(GAS_REPORT_DIR)
+    if os.environ.get("GAS_WRITE_BASELINE"):
+        GAS_REPORT.to_json(GAS_BASELINE)
+        console.print("[green]Gas baseline written to {}[/green]".format(GAS_BASELINE))
+        return True
+    if not os.path.exists(GAS_BASELINE):
+        GAS_REPORT.to_json(GAS_BASELINE)
+        console.print("[red]No gas baseline, this run was recorded as one[/red]")
+        console.print(
+            "Commit {} to check the next runs against it".format(GAS_BASELINE)
+        )
+        return False
+    regressions = GAS_REPORT.compare(GasReport.load(GAS_BASELINE), GAS_TOLERANCE)
+    if regressions:
+        console.print(
+            "[red]=== Gas regressions over {} bps ===[/red]".format(GAS_TOLERANCE)
+        )
+        for regression in regressions:
+            console.print("{}: {} -> {} (+{} bps)".format(*regression))
+    return not regressions
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_testnodedown(node, error):
+    GAS_REPORT.merge(received(node, "gasReport") or {})
+    metrics.session.merge(received(node, "snapMetrics") or {})
+    state = received(node, "gasTrace")
+    if state:
+        gas_trace.session.merge(state)
+
+
+def pytest_sessionfinish(session, exitstatus):
+    config = session.config
+    if is_worker(config):
+        send(config, "gasReport", GAS_REPORT.entries)
+        send(config, "snapMetrics", metrics.session.state())
+        send(config, "gasTrace", gas_trace.session.state())
+        return
+
+    ## Where snap time went, over every SnapshotManager of the session
+    if len(metrics.session):
+        console.print("[green]=== Snap metrics ===[/green]")
+        metrics.session.print()
+    ## With GAS_TRACE=1, gas of every SnapshotManager action by function
+    if len(gas_trace.session):
+        console.print("[green]=== Gas by function ===[/green]")
+        gas_trace.session.print()
+    if len(GAS_REPORT) and not check_gas_report():
+        session.exitstatus = pytest.ExitCode.TESTS_FAILED
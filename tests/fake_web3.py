@@ -0,0 +1,120 @@
+import sys
+
+from eth_abi import decode_single, encode_single
+from eth_utils import function_signature_to_4byte_selector, to_bytes
+
+"""
+  A fake web3 for the chain-bound helpers, patched in over their module web3
+
+  FakeEth runs the multicall aggregate and tryBlockAndAggregate contracts in
+  Python against HANDLERS, which answer for a fake token at any address.
+  Blocks and contract code are plain attributes, tests move the head or
+  drop code by setting them.
+"""
+
+# Modules holding `from brownie import web3`, that Multicall runs through
+MULTICALL_MODULES = (
+    "helpers.multicall.call",
+    "helpers.multicall.multicall",
+    "helpers.multicall.plan",
+)
+
+
+def selector(signature):
+    return function_signature_to_4byte_selector(signature)
+
+
+# selector -> output of the fake token, None reverts
+HANDLERS = {
+    selector("balanceOf(address)"): lambda args: encode_single(
+        "uint256", int.from_bytes(args[12:32], "big") & 0xFFFF
+    ),
+    selector("boom()"): lambda args: None,
+    selector("empty()"): lambda args: b"",
+}
+
+
+def balance(user):
+    """
+    What the fake token's balanceOf returns for user
+    """
+    return int(user[-4:], 16)
+
+
+class FakeEth:
+    chainId = 250
+
+    def __init__(self, max_calls=None):
+        self.block_number = 100
+        # Aggregates with more calls than this are refused like an oversized request
+        self.max_calls = max_calls
+        # (number of calls, block_identifier, calldata) of every eth_call
+        self.requests = []
+        # Called with the number of requests so far, before every eth_call answers
+        self.before_call = None
+        # block number -> hash, in place of the number as 32 bytes
+        self.hashes = {}
+        # address -> deployed code
+        self.code = {}
+
+    def call(self, tx, block_identifier=None):
+        data = bytes(tx["data"])
+        tryAggregate = data[:4] != selector("aggregate((address,bytes)[])")
+        if tryAggregate:
+            _, calls = decode_single("(bool,(address,bytes)[])", data[4:])
+        else:
+            (calls,) = decode_single("((address,bytes)[])", data[4:])
+        self.requests.append((len(calls), block_identifier, data))
+        if self.before_call:
+            self.before_call(len(self.requests))
+        if self.max_calls is not None and len(calls) > self.max_calls:
+            raise ValueError("request too large")
+
+        outputs = [HANDLERS[calldata[:4]](calldata[4:]) for _, calldata in calls]
+        block = self.block_number if block_identifier is None else block_identifier
+        if tryAggregate:
+            return encode_single(
+                "(uint256,bytes32,(bool,bytes)[])",
+                (
+                    block,
+                    b"\0" * 32,
+                    [(output is not None, output or b"") for output in outputs],
+                ),
+            )
+        if None in outputs:
+            raise ValueError("execution reverted")
+        return encode_single("(uint256,bytes[])", (block, outputs))
+
+    def get_block(self, block_identifier):
+        """
+        Blocks by number, "latest" or hash, the hash of block n is n as 32 bytes
+        unless hashes has one
+        """
+        if block_identifier == "latest":
+            number = self.block_number
+        elif isinstance(block_identifier, int):
+            number = block_identifier
+        else:
+            number = int.from_bytes(to_bytes(hexstr=block_identifier), "big")
+        return {
+            "number": number,
+            "hash": self.hashes.get(number, number.to_bytes(32, "big")),
+        }
+
+    def get_code(self, address):
+        return self.code.get(address, b"")
+
+
+class FakeWeb3:
+    def __init__(self, eth):
+        self.eth = eth
+
+
+def patch_web3(monkeypatch, eth, modules=MULTICALL_MODULES):
+    """
+    Points the web3 of every module in modules at a FakeWeb3 over eth
+    """
+    web3 = FakeWeb3(eth)
+    for module in modules:
+        monkeypatch.setattr(sys.modules[module], "web3", web3)
+    return web3
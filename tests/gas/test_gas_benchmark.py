@@ -0,0 +1,100 @@
+import brownie
+import pytest
+from brownie import *
+from helpers.constants import MaxUint256
+
+"""
+  Gas of every strategy action over deposit size, borrowDepth and collateralTarget
+  Results go to the session gas_report, see tests/conftest.py
+  36 runs on the fork, skipped unless run with brownie test -m gas
+"""
+
+pytestmark = pytest.mark.gas
+
+DEPOSIT_SHARES = [0.01, 0.1, 0.5]
+BORROW_DEPTHS = [1, 3, 5, 8]
+# collateralTarget as a percentage of the market's collateral factor
+COLLATERAL_SHARES = [60, 75, 90]
+
+
+@pytest.fixture(scope="module")
+def strategy(deployed):
+    """
+    MyStrategyHarness in place of the deployed strategy, it can set borrowDepth
+    module_isolation puts the deployed strategy back after the module
+    """
+    harness = MyStrategyHarness.deploy({"from": deployed.deployer})
+    harness.initialize(deployed.vault, [deployed.want])
+    deployed.vault.setStrategy(harness, {"from": deployed.governance})
+    return harness
+
+
+@pytest.fixture(scope="module")
+def collateralFactor(strategy):
+    _, collateralFactor, _ = interface.IComptroller(strategy.comptroller()).markets(
+        strategy.iToken()
+    )
+    return collateralFactor
+
+
+def test_default_collateral_target_below_factor(strategy, collateralFactor):
+    assert 0 < strategy.collateralTarget() < collateralFactor
+
+
+def test_borrow_depth_bounds(strategy, deployed):
+    governance = deployed.governance
+    ## _ReleaseBorrow counts rounds in a uint8, a deeper loop would never end
+    for borrowDepth in (0, 256):
+        with brownie.reverts():
+            strategy.setBorrowDepth(borrowDepth, {"from": governance})
+    strategy.setBorrowDepth(255, {"from": governance})
+    assert strategy.borrowDepth() == 255
+
+
+@pytest.mark.parametrize("depositShare", DEPOSIT_SHARES)
+@pytest.mark.parametrize("borrowDepth", BORROW_DEPTHS)
+@pytest.mark.parametrize("collateralShare", COLLATERAL_SHARES)
+def test_gas_benchmark(
+    deployed,
+    strategy,
+    collateralFactor,
+    gas_report,
+    depositShare,
+    borrowDepth,
+    collateralShare,
+):
+    vault = deployed.vault
+    want = deployed.want
+    deployer = deployed.deployer
+    governance = deployed.governance
+    params = {
+        "depositShare": depositShare,
+        "borrowDepth": borrowDepth,
+        "collateralShare": collateralShare,
+    }
+
+    strategy.setBorrowDepth(borrowDepth, {"from": governance})
+    strategy.setCollateralTarget(
+        collateralFactor * collateralShare // 100, {"from": governance}
+    )
+
+    depositAmount = int(want.balanceOf(deployer) * depositShare)
+    want.approve(vault, MaxUint256, {"from": deployer})
+    gas_report.record(
+        "deposit", params, vault.deposit(depositAmount, {"from": deployer})
+    )
+    gas_report.record("earn", params, vault.earn({"from": governance}))
+
+    # Want left on the strategy is what tend leverages
+    want.transfer(strategy, depositAmount // 100, {"from": deployer})
+    gas_report.record("tend", params, strategy.tend({"from": governance}))
+
+    chain.sleep(10000 * 13)
+    chain.mine(1000)
+    gas_report.record("harvest", params, strategy.harvest({"from": governance}))
+
+    shares = vault.balanceOf(deployer)
+    gas_report.record(
+        "withdraw", params, vault.withdraw(shares // 2, {"from": deployer})
+    )
+    gas_report.record("withdrawAll", params, vault.withdrawAll({"from": deployer}))
@@ -0,0 +1,40 @@
+from brownie import *
+from helpers.constants import MaxUint256
+from helpers.SnapshotManager import SnapshotManager
+
+"""
+  SnapshotManager.snap pinned to a block by number, tag and hash
+"""
+
+
+def test_pinned_snap_reads_past_state(deployer, vault, strategy, want):
+    snap = SnapshotManager(vault, strategy, "StrategySnapshot")
+    trackedUsers = {"user": deployer.address}
+
+    before = snap.snap(trackedUsers)
+    pinned = chain.height
+
+    want.approve(vault, MaxUint256, {"from": deployer})
+    vault.deposit(want.balanceOf(deployer) // 2, {"from": deployer})
+    chain.mine(2)
+
+    byNumber = snap.snap(trackedUsers, block_identifier=pinned)
+    assert byNumber.block == byNumber.aggregateBlock == pinned
+    assert byNumber.balances("sett", "user") == before.balances("sett", "user")
+    assert byNumber.get("sett.totalSupply") == before.get("sett.totalSupply")
+
+    byHash = snap.snap(trackedUsers, block_identifier=web3.eth.get_block(pinned).hash)
+    assert byHash.block == pinned
+    assert byHash.balances("sett", "user") == before.balances("sett", "user")
+
+    latest = snap.snap(trackedUsers, block_identifier="latest")
+    assert latest.block == latest.aggregateBlock == chain.height
+    assert latest.balances("sett", "user") > before.balances("sett", "user")
+
+
+def test_snap_range_is_ascending(deployer, vault, strategy):
+    snap = SnapshotManager(vault, strategy, "StrategySnapshot")
+    chain.mine(3)
+    head = chain.height
+    snaps = snap.snapRange([head, head - 2, head - 1, head - 2])
+    assert [s.block for s in snaps] == [head - 2, head - 1, head]
@@ -0,0 +1,51 @@
+import pytest
+
+from fake_web3 import FakeEth, balance, patch_web3
+from helpers.multicall import Call, CallPlan, Multicall
+
+"""
+  A CallPlan is compiled once and runs again without building or encoding calls
+"""
+
+TOKEN = "0x" + "11" * 20
+USERS = ["0x" + "%02x" % i * 20 for i in range(0x20, 0x40)]
+
+
+@pytest.fixture
+def eth(monkeypatch):
+    eth = FakeEth()
+    patch_web3(monkeypatch, eth)
+    return eth
+
+
+def balance_calls(users):
+    return [
+        Call(TOKEN, ["balanceOf(address)(uint256)", user], [[user, None]])
+        for user in users
+    ]
+
+
+def test_call_plan_compiles_chunks_and_decoders(eth):
+    calls = balance_calls(USERS[:5])
+    plan = CallPlan(calls, max_calls=2)
+    assert [len(chunk) for chunk in plan.chunks] == [2, 2, 1]
+    assert [bytes(data) for data in plan.calldata] == [
+        bytes(plan.encode(chunk)) for chunk in plan.chunks
+    ]
+    assert [call for call, _ in plan.decoders] == calls
+
+
+def test_call_plan_is_reused_without_encoding(eth, monkeypatch):
+    plan = CallPlan(balance_calls(USERS[:5]), max_calls=2)
+
+    def encode(calls):
+        raise AssertionError("plan re-encoded")
+
+    monkeypatch.setattr(plan, "encode", encode)
+    first = Multicall(plan)()
+    eth.block_number += 1
+    second = Multicall(plan)()
+
+    assert first == second == {user: balance(user) for user in USERS[:5]}
+    sent = [data for _, _, data in eth.requests]
+    assert sent[:3] == sent[3:] == [bytes(data) for data in plan.calldata]
@@ -0,0 +1,65 @@
+import json
+
+import pytest
+
+from fake_web3 import FakeEth, patch_web3
+from helpers.deployment_cache import DeploymentCache, config_hash
+
+"""
+  DeploymentCache against a fake chain with a head block and contract code
+"""
+
+VAULT = "0x" + "11" * 20
+STRATEGY = "0x" + "22" * 20
+ADDRESSES = {"vault": VAULT, "strategy": STRATEGY}
+
+
+@pytest.fixture
+def eth(monkeypatch):
+    eth = FakeEth()
+    eth.code = {VAULT: b"\x60\x80", STRATEGY: b"\x60\x80"}
+    patch_web3(monkeypatch, eth, ("helpers.deployment_cache",))
+    return eth
+
+
+def test_config_hash():
+    key = config_hash("bytecode", 250, "gw0")
+    assert key == config_hash("bytecode", 250, "gw0")
+    assert len(key) == 16 and int(key, 16) >= 0
+    # Any part changes the key, parts don't run into each other
+    assert key != config_hash("bytecode", 250, "gw1")
+    assert config_hash("ab", "c") != config_hash("a", "bc")
+
+
+def test_saved_deployment_is_reused(eth, tmp_path):
+    path = str(tmp_path / "cache" / "deployments.json")
+    cache = DeploymentCache(path)
+    assert cache.get("key") is None
+
+    cache.save("key", ADDRESSES)
+    assert cache.get("key") == ADDRESSES
+    assert cache.get("other") is None
+    # Written whole, read back by the next run
+    assert not (tmp_path / "cache" / "deployments.json.tmp").exists()
+    assert json.load(open(path))["key"]["block"] == 100
+    assert DeploymentCache(path).get("key") == ADDRESSES
+
+
+def test_moved_chain_is_a_miss(eth, tmp_path):
+    cache = DeploymentCache(str(tmp_path / "deployments.json"))
+    cache.save("key", ADDRESSES)
+
+    eth.block_number += 1
+    assert cache.get("key") is None
+
+    # Back at the same height on another chain
+    eth.block_number = 100
+    eth.hashes[100] = b"\x03" * 32
+    assert cache.get("key") is None
+
+
+def test_missing_code_is_a_miss(eth, tmp_path):
+    cache = DeploymentCache(str(tmp_path / "deployments.json"))
+    cache.save("key", ADDRESSES)
+    del eth.code[STRATEGY]
+    assert cache.get("key") is None
@@ -0,0 +1,56 @@
+from helpers.fee_simulator import simulate_harvests
+from helpers.shares_math import (
+    MAX_BPS,
+    SECS_PER_YEAR,
+    from_shares_to_want,
+    get_report_fees,
+)
+from helpers.time import days
+
+"""
+  The harvest simulator must reproduce get_report_fees harvest by harvest
+"""
+
+
+def test_single_harvest_matches_report_fees():
+    result = simulate_harvests(days(7), 250, days(7), 8, management_fee=200)
+    gain = 10 ** 8 * 250 * days(7) // SECS_PER_YEAR // MAX_BPS
+    fees = get_report_fees(gain, 1_000, 1_000, 200, days(7), 10 ** 8, 10 ** 8)
+
+    assert result.harvests == 1
+    assert result.balance == 10 ** 8 + gain
+    assert result.treasury_shares == fees.shares_perf_treasury + fees.shares_management
+    assert result.strategist_shares == fees.shares_perf_strategist
+    assert result.total_supply == (
+        10 ** 8 + result.treasury_shares + result.strategist_shares
+    )
+
+
+def test_grid_matches_single_configs():
+    intervals = [[days(0.25)], [days(1)], [days(7)]]
+    fees = [0, 1_000, 2_000]
+    grid = simulate_harvests(
+        intervals, 500, days(30), 8, performance_fee_treasury=fees, record_every=24
+    )
+    assert grid.ppfs_path.shape == (30, 3, 3)
+    for i, [interval] in enumerate(intervals):
+        for j, fee in enumerate(fees):
+            single = simulate_harvests(
+                interval, 500, days(30), 8, performance_fee_treasury=fee
+            )
+            assert grid.ppfs[i, j] == single.ppfs
+            assert grid.total_supply[i, j] == single.total_supply
+            assert grid.harvests[i, j] == days(30) // interval
+
+
+def test_ppfs_is_scaled_by_the_vault_decimals():
+    for decimals in (8, 18):
+        result = simulate_harvests(days(1), 0, days(3), decimals)
+        # No yield, no fees, shares stay worth one want each
+        assert result.ppfs == 10 ** decimals
+
+    result = simulate_harvests(days(1), 500, days(3), 8)
+    assert result.ppfs > 10 ** 8
+    # Redeeming every share at that PPFS gives back the balance, less rounding
+    value = from_shares_to_want(result.total_supply, result.ppfs, 8)
+    assert result.balance - value <= result.total_supply // 10 ** 8 + 1
@@ -0,0 +1,27 @@
+from helpers.gas_report import GasReport
+
+
+def report(gas):
+    report = GasReport()
+    for (action, depth), used in gas.items():
+        report.record(action, {"borrowDepth": depth}, used)
+    return report
+
+
+def test_compare_flags_regressions_over_tolerance(tmp_path):
+    baseline = report({("earn", 1): 100_000, ("earn", 5): 400_000})
+    baseline.to_json(tmp_path / "gas.json")
+    baseline = GasReport.load(tmp_path / "gas.json")
+
+    run = report({("earn", 1): 101_000, ("earn", 5): 420_000, ("harvest", 5): 300_000})
+    assert run.compare(baseline, tolerance_bps=200) == [
+        ("earn|borrowDepth=5", 400_000, 420_000, 500)
+    ]
+    assert run.compare(baseline, tolerance_bps=500) == []
+
+
+def test_csv_has_a_column_per_param(tmp_path):
+    run = report({("deposit", 3): 80_000})
+    run.to_csv(tmp_path / "gas.csv")
+    lines = (tmp_path / "gas.csv").read_text().splitlines()
+    assert lines == ["action,borrowDepth,gas", "deposit,3,80000"]
@@ -0,0 +1,67 @@
+from helpers.gas_trace import GasProfile, attribute
+
+ITOKEN = "0x0000000000000000000000000000000000000001"
+
+
+def step(fn, depth, jumpDepth, gas, gasCost=3, address=None):
+    return {
+        "fn": fn,
+        "depth": depth,
+        "jumpDepth": jumpDepth,
+        "gas": gas,
+        "gasCost": gasCost,
+        "address": address,
+    }
+
+
+# harvest -> _Leverage -> iToken.mint, then back in harvest
+TRACE = [
+    step("MyStrategy.harvest", 0, 0, 10_000),
+    step("MyStrategy._Leverage", 0, 1, 9_900),
+    step("MyStrategy._Leverage", 0, 1, 9_800, gasCost=2_000),
+    step("CToken.mint", 1, 0, 7_000, address=ITOKEN),
+    step("CToken.mint", 1, 0, 6_000, gasCost=1_000, address=ITOKEN),
+    step("MyStrategy._Leverage", 0, 1, 7_000),
+    step("MyStrategy.harvest", 0, 0, 6_500),
+    step("MyStrategy.harvest", 0, 0, 6_000, gasCost=0),
+]
+
+
+class Tx:
+    gas_used = 30_000
+    trace = TRACE
+
+
+def test_attribute_inclusive_and_self_gas():
+    totals = attribute(TRACE, {ITOKEN: "iToken"})
+    assert totals["iToken.mint"] == [1, 2_000, 2_000]
+    # 9_900 at entry, 7_000 - 3 after its last step
+    assert totals["MyStrategy._Leverage"] == [1, 2_903, 903]
+    assert totals["MyStrategy.harvest"] == [1, 4_000, 1_097]
+
+
+def test_profile_aggregates_actions():
+    profile = GasProfile()
+    profile.label(ITOKEN, "iToken")
+    profile.record("harvest", Tx())
+    profile.record("harvest", Tx())
+
+    assert len(profile) == 2
+    rows = profile.rows(focus=True)
+    assert [row[1] for row in rows] == ["MyStrategy._Leverage", "iToken.mint"]
+    assert rows[0][2:5] == (2, 5_806, 1_806)
+    # 5_806 of 60_000 gas_used
+    assert rows[0][5] == 967
+
+
+def test_profile_merges_worker_state():
+    controller = GasProfile()
+    worker = GasProfile()
+    for profile in (controller, worker):
+        profile.label(ITOKEN, "iToken")
+    controller.record("harvest", Tx())
+    worker.record("harvest", Tx())
+
+    controller.merge(worker.state())
+    assert len(controller) == 2
+    assert controller.actions["harvest"]["iToken.mint"] == [2, 4_000, 4_000]
@@ -0,0 +1,111 @@
+import random
+
+from helpers.holder_index import TRANSFER_TOPIC, ZERO_ADDRESS, HolderIndex
+
+"""
+  HolderIndex over a fake eth_getLogs that refuses ranges with too many logs
+"""
+
+TOKEN = "0x" + "11" * 20
+USERS = ["0x" + "%02x" % i * 20 for i in range(0x20, 0x28)]
+MAX_RESULTS = 5
+
+
+def topic(address):
+    return "0x" + "00" * 12 + address[2:]
+
+
+def make_chain(blocks=500):
+    random.seed(3)
+    logs = []
+    balances = {}
+
+    def transfer(block, sender, receiver, value):
+        if sender != ZERO_ADDRESS:
+            balances[sender] -= value
+        balances[receiver] = balances.get(receiver, 0) + value
+        logs.append((block, sender, receiver, value))
+
+    for block in range(blocks - 1):
+        if random.random() < 0.3:
+            sender = random.choice([ZERO_ADDRESS] + USERS)
+            receiver = random.choice(USERS)
+            if sender == ZERO_ADDRESS:
+                value = random.randrange(1, 100)
+            elif balances.get(sender, 0) == 0:
+                continue
+            elif random.random() < 0.2:
+                ## Sends everything it holds
+                value = balances[sender]
+            else:
+                value = random.randrange(1, balances[sender] + 1)
+            transfer(block, sender, receiver, value)
+
+    ## The largest holder drains into another user on the last block
+    sender = max(USERS, key=lambda user: balances.get(user, 0))
+    receiver = next(user for user in USERS if user != sender)
+    transfer(blocks - 1, sender, receiver, balances[sender])
+    return logs
+
+
+def fake_get_logs(chain, calls):
+    def get_logs(params):
+        calls.append((params["fromBlock"], params["toBlock"]))
+        assert params["topics"] == [TRANSFER_TOPIC]
+        found = [
+            {
+                "topics": [TRANSFER_TOPIC, topic(sender), topic(receiver)],
+                "data": "0x" + value.to_bytes(32, "big").hex(),
+            }
+            for block, sender, receiver, value in chain
+            if params["fromBlock"] <= block <= params["toBlock"]
+        ]
+        if len(found) > MAX_RESULTS:
+            raise ValueError({"message": "query returned more than 5 results"})
+        return found
+
+    return get_logs
+
+
+def expected_balances(chain, to_block):
+    balances = {}
+    for block, sender, receiver, value in chain:
+        if block > to_block:
+            break
+        if sender != ZERO_ADDRESS:
+            balances[sender] = balances.get(sender, 0) - value
+        balances[receiver] = balances.get(receiver, 0) + value
+    return {holder.lower(): value for holder, value in balances.items() if value}
+
+
+def test_index_splits_ranges_and_resumes(tmp_path):
+    chain = make_chain()
+    calls = []
+    path = str(tmp_path / "holders.json")
+
+    index = HolderIndex(path, [TOKEN], get_logs=fake_get_logs(chain, calls))
+    assert index.update(to_block=249) == 249
+    ## Ranges too big were split
+    assert len(calls) > 1
+    firstRun = len(calls)
+
+    ## A new index picks up from the checkpoint
+    resumed = HolderIndex(path, [TOKEN], get_logs=fake_get_logs(chain, calls))
+    resumed.update(to_block=499)
+    assert min(start for start, _ in calls[firstRun:]) == 250
+    balances = {
+        holder.lower(): value for holder, value in resumed.balances(TOKEN).items()
+    }
+    assert balances == expected_balances(chain, 499)
+    holders = resumed.holders(TOKEN)
+    assert set(holder.lower() for holder in holders) == set(balances)
+    assert [resumed.balances(TOKEN)[holder] for holder in holders] == sorted(
+        balances.values(), reverse=True
+    )
+
+    ## Holders that sent their whole balance are gone
+    drained = {
+        sender.lower() for _, sender, _, _ in chain if sender != ZERO_ADDRESS
+    } - set(balances)
+    assert drained
+    assert drained.isdisjoint(holder.lower() for holder in holders)
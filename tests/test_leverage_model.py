@@ -0,0 +1,46 @@
+from helpers.leverage_model import LeverageModel
+
+"""
+  The leverage model must follow MyStrategy round by round, and a grid run must
+  match running every configuration on its own
+"""
+
+COLLATERAL_FACTOR = 75 * 10 ** 16
+
+
+def test_deposit_leverages_to_target():
+    model = LeverageModel(COLLATERAL_FACTOR)
+    model.deposit(10 ** 8)
+    result = model.result()
+
+    ## desireBorrows = 1e8 * 0.68 / 0.32, short of the 10 wei guard of the last round
+    assert result.borrows == 10 ** 8 * 68 // 32 - 10
+    assert result.supplys == 10 ** 8 + result.borrows
+    assert result.want == 0
+    assert result.rounds == 5 and result.mints == 6
+    assert not result.reverted
+
+
+def test_grid_matches_single_configs():
+    targets = [[50 * 10 ** 16], [68 * 10 ** 16], [74 * 10 ** 16]]
+    depths = [1, 3, 5, 10]
+    grid = LeverageModel(
+        COLLATERAL_FACTOR, collateral_target=targets, borrow_depth=depths
+    )
+    grid.deposit(10 ** 8)
+    gridWithdrawn, gridLoss = grid.withdraw_some(4 * 10 ** 7)
+    gridResult = grid.result()
+
+    for i, [target] in enumerate(targets):
+        for j, depth in enumerate(depths):
+            single = LeverageModel(
+                COLLATERAL_FACTOR, collateral_target=target, borrow_depth=depth
+            )
+            single.deposit(10 ** 8)
+            withdrawn, loss = single.withdraw_some(4 * 10 ** 7)
+            result = single.result()
+
+            assert gridWithdrawn[i, j] == withdrawn
+            assert gridLoss[i, j] == loss
+            for key in ("supplys", "borrows", "want", "rounds", "redeems", "reverted"):
+                assert gridResult[key][i, j] == result[key]
@@ -0,0 +1,98 @@
+import itertools
+
+from helpers.leverage_model import ONE, LeverageModel
+from helpers.leverage_solver import (
+    borrowed_after,
+    estimate_increase_borrow,
+    estimate_rounds,
+    leverage_limit,
+    round_borrow,
+    solve_deposit,
+    solve_increase_borrow,
+)
+
+"""
+  The solver must land exactly where the round by round model does
+"""
+
+COLLATERAL_FACTORS = [50 * 10 ** 16, 75 * 10 ** 16, 90 * 10 ** 16]
+TARGETS = [40 * 10 ** 16, 68 * 10 ** 16, 74 * 10 ** 16]
+DEPTHS = [1, 2, 5, 50]
+AMOUNTS = [999, 10 ** 4, 10 ** 8, 123456789012]
+
+
+def test_solve_deposit_matches_model():
+    for factor, target, depth, amount in itertools.product(
+        COLLATERAL_FACTORS, TARGETS, DEPTHS, AMOUNTS
+    ):
+        model = LeverageModel(
+            factor, collateral_target=target, borrow_depth=depth, exchange_rate=10 ** 18
+        )
+        model.deposit(amount)
+        result = model.result()
+        solved = solve_deposit(
+            amount, factor, collateral_target=target, borrow_depth=depth
+        )
+
+        assert solved.reverted == result.reverted
+        if solved.reverted:
+            continue
+        for key in ("supplys", "borrows", "want", "rounds", "mints", "not_all"):
+            assert solved[key] == result[key], (factor, target, depth, amount, key)
+
+
+def test_rounds_estimate_and_limit():
+    stake = 10 ** 8
+    supply, borrow = leverage_limit(stake, 0.68)
+    amount = int(borrow)
+
+    solved = solve_increase_borrow(amount, stake, 75 * 10 ** 16, borrow_depth=100)
+    assert estimate_rounds(amount, stake, 75 * 10 ** 16) == solved.rounds
+    assert abs(solved.supply_increase - supply) <= stake * 1e-6
+
+
+def test_series_matches_model_rounds():
+    stakes = [10 ** 4, 10 ** 8, 123456789012]
+    depths = list(range(1, 21))
+    for factor, stake in itertools.product(COLLATERAL_FACTORS, stakes):
+        ## Nothing caps the rounds but borrowDepth
+        model = LeverageModel(
+            factor, borrow_depth=depths, exchange_rate=10 ** 18, want=stake
+        )
+        model.increase_borrow(model.uint(10 ** 30), model.uint(stake), True)
+        result = model.result()
+        floorError = 1 / (1 - factor / ONE)
+        ## Rounding of the float series itself
+        slack = stake * 1e-12
+
+        previous = 0
+        for k, borrowed, reverted in zip(depths, result.borrows, result.reverted):
+            ## Past the round where the stake no longer covers the guard
+            if reverted:
+                break
+            error = round_borrow(stake, factor, k) - (borrowed - previous)
+            assert -slack <= error <= floorError + slack, (factor, stake, k)
+            error = borrowed_after(stake, factor, k) - borrowed
+            assert -slack <= error <= k * floorError + slack, (factor, stake, k)
+            previous = borrowed
+
+
+def test_estimate_increase_borrow_matches_model():
+    stakes = [10 ** 3, 10 ** 6, 10 ** 8, 10 ** 12]
+    for factor, depth, amount, stake in itertools.product(
+        COLLATERAL_FACTORS, DEPTHS, AMOUNTS, stakes
+    ):
+        model = LeverageModel(
+            factor, borrow_depth=depth, exchange_rate=10 ** 18, want=stake
+        )
+        model.increase_borrow(model.uint(amount), model.uint(stake), True)
+        result = model.result()
+        if result.reverted:
+            continue
+        estimate = estimate_increase_borrow(amount, stake, factor, depth)
+
+        assert abs(estimate.rounds - result.rounds) <= 1
+        if estimate.rounds == result.rounds:
+            floorError = estimate.rounds / (1 - factor / ONE)
+            assert abs(estimate.borrow_increase - result.borrows) <= floorError
+            assert estimate.mints == result.mints
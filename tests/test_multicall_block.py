@@ -0,0 +1,57 @@
+import pytest
+
+from fake_web3 import FakeEth, balance, patch_web3
+from helpers.multicall import Call, Multicall
+from helpers.multicall.multicall import block_number
+
+"""
+  Multicall pinned to a block identifier, and the aggregate block it reports
+"""
+
+TOKEN = "0x" + "11" * 20
+USERS = ["0x" + "%02x" % i * 20 for i in range(0x20, 0x40)]
+
+
+@pytest.fixture
+def eth(monkeypatch):
+    eth = FakeEth()
+    patch_web3(monkeypatch, eth)
+    return eth
+
+
+def balance_calls(users):
+    return [
+        Call(TOKEN, ["balanceOf(address)(uint256)", user], [[user, None]])
+        for user in users
+    ]
+
+
+def test_block_identifier_pins_every_chunk(eth):
+    multi = Multicall(balance_calls(USERS[:5]), max_calls=2, block_identifier=90)
+    multi()
+    assert [block for _, block, _ in eth.requests] == [90, 90, 90]
+    assert multi.block == 90
+
+
+def test_aggregate_block_is_kept(eth):
+    multi = Multicall(balance_calls(USERS[:3]))
+    multi()
+    assert multi.block == 100
+
+
+def test_bisected_halves_read_one_block(eth):
+    eth.max_calls = 2
+    users = USERS[:7]
+    multi = Multicall(balance_calls(users))
+    assert list(multi().items()) == [(user, balance(user)) for user in users]
+
+    # Halves after the first refusal are pinned to the block read for them
+    assert eth.requests[0][1] is None
+    assert {block for _, block, _ in eth.requests[1:]} == {100}
+    assert multi.block == 100
+
+
+def test_block_number_of_any_identifier(eth):
+    assert block_number(90) == 90
+    assert block_number("latest") == 100
+    assert block_number("0x" + (95).to_bytes(32, "big").hex()) == 95
@@ -0,0 +1,60 @@
+import pytest
+
+from fake_web3 import FakeEth, balance, patch_web3
+from helpers.multicall import Call, Multicall
+from helpers.multicall.plan import chunk_calls
+
+"""
+  Multicall chunking by payload size, and bisection of chunks the node refuses
+"""
+
+TOKEN = "0x" + "11" * 20
+USERS = ["0x" + "%02x" % i * 20 for i in range(0x20, 0x40)]
+
+
+@pytest.fixture
+def eth(monkeypatch):
+    eth = FakeEth()
+    patch_web3(monkeypatch, eth)
+    return eth
+
+
+def balance_calls(users):
+    return [
+        Call(TOKEN, ["balanceOf(address)(uint256)", user], [[user, None]])
+        for user in users
+    ]
+
+
+def test_chunks_respect_every_limit():
+    calls = balance_calls(USERS[:10])
+    # One balanceOf adds 4 * 32 + 64 bytes of calldata and 2 * 32 + 32 of return data
+    assert [len(chunk) for chunk in chunk_calls(calls, max_calls=4)] == [4, 4, 2]
+    byCalldata = chunk_calls(calls, max_calldata=192 * 3)
+    assert [len(chunk) for chunk in byCalldata] == [3, 3, 3, 1]
+    byReturndata = chunk_calls(calls, max_returndata=96 * 5)
+    assert [len(chunk) for chunk in byReturndata] == [5, 5]
+    # A call over the limits on its own still gets a chunk
+    assert [len(chunk) for chunk in chunk_calls(calls[:2], max_calldata=1)] == [1, 1]
+
+
+def test_chunks_run_in_order(eth):
+    users = USERS[:10]
+    data = Multicall(balance_calls(users), max_calls=3)()
+    assert list(data.items()) == [(user, balance(user)) for user in users]
+    assert [calls for calls, _, _ in eth.requests] == [3, 3, 3, 1]
+
+
+def test_refused_chunks_are_bisected(eth):
+    eth.max_calls = 2
+    users = USERS[:7]
+    data = Multicall(balance_calls(users))()
+    assert list(data.items()) == [(user, balance(user)) for user in users]
+    # 7 and then 3 and 4 are refused, their halves go through
+    assert [calls for calls, _, _ in eth.requests] == [7, 3, 1, 2, 4, 2, 2]
+
+
+def test_single_refused_call_is_raised(eth):
+    eth.max_calls = 0
+    with pytest.raises(ValueError):
+        Multicall(balance_calls(USERS[:3]))()
@@ -0,0 +1,104 @@
+import pytest
+from eth_abi import decode_single, encode_single
+from eth_abi.exceptions import DecodingError
+
+from fake_web3 import FakeEth, patch_web3
+from helpers.multicall import Call, Multicall
+from helpers.multicall.plan import split_aggregate, split_try_block_and_aggregate
+from helpers.multicall.signature import Signature
+
+"""
+  One pass decoding of aggregate return data and the static word fast path
+"""
+
+TOKEN = "0x" + "11" * 20
+USERS = ["0x" + "%02x" % i * 20 for i in range(0x20, 0x40)]
+
+
+@pytest.fixture
+def eth(monkeypatch):
+    eth = FakeEth()
+    patch_web3(monkeypatch, eth)
+    return eth
+
+
+def balance_calls(users):
+    return [
+        Call(TOKEN, ["balanceOf(address)(uint256)", user], [[user, None]])
+        for user in users
+    ]
+
+
+WORDS = [
+    0,
+    1,
+    2,
+    127,
+    128,
+    255,
+    256,
+    2 ** 160 - 1,
+    2 ** 160,
+    2 ** 255 - 1,
+    2 ** 255,
+    2 ** 256 - 128,
+    2 ** 256 - 129,
+    2 ** 256 - 1,
+]
+TYPES = ["uint256", "uint8", "uint128", "int256", "int8", "int64", "bool", "address"]
+
+
+def decoded_or_error(decode, data):
+    try:
+        return decode(data)
+    except DecodingError:
+        return "error"
+
+
+@pytest.mark.parametrize("abi_type", TYPES)
+def test_word_decoders_match_eth_abi(abi_type):
+    signature = Signature("f()({},uint256)".format(abi_type))
+    assert signature.words is not None
+    for word in WORDS:
+        data = word.to_bytes(32, "big") + (7).to_bytes(32, "big")
+        expected = decoded_or_error(
+            lambda data: decode_single("({},uint256)".format(abi_type), data), data
+        )
+        assert decoded_or_error(signature.decode_data, data) == expected, hex(word)
+
+
+def test_dynamic_outputs_go_to_eth_abi():
+    assert Signature("f()(address[])").words is None
+    assert Signature("f()((uint256,bool))").words is None
+
+
+def test_malformed_aggregate_data_is_raised():
+    good = encode_single("(uint256,bytes[])", (5, [b"a" * 32, b"b" * 32]))
+    assert split_aggregate(good) == (5, [(True, b"a" * 32), (True, b"b" * 32)])
+    with pytest.raises(ValueError):
+        split_aggregate(b"")
+    with pytest.raises(ValueError):
+        split_aggregate(good[:-40])
+    with pytest.raises(ValueError):
+        split_try_block_and_aggregate(good[:64])
+
+
+def test_empty_or_short_aggregate_is_not_an_empty_result(eth, monkeypatch):
+    calls = balance_calls(USERS[:3])
+    sent = []
+
+    def empty(tx, block=None):
+        sent.append(tx)
+        return b""
+
+    # No contract at the multicall address answers with empty return data
+    monkeypatch.setattr(eth, "call", empty)
+    with pytest.raises(ValueError, match="no multicall contract"):
+        Multicall(calls)()
+    # Not retried in halves, smaller chunks get the same answer
+    assert len(sent) == 1
+
+    short = encode_single("(uint256,bytes[])", (5, [b"\0" * 32]))
+    monkeypatch.setattr(eth, "call", lambda tx, block=None: short)
+    with pytest.raises(ValueError, match="1 results for 3 calls"):
+        Multicall(calls)()
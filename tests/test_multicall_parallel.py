@@ -0,0 +1,48 @@
+import time
+
+import pytest
+
+from fake_web3 import FakeEth, balance, patch_web3
+from helpers.multicall import Call, Multicall
+
+"""
+  Chunks sent over a thread pool come back in order and read one block
+"""
+
+TOKEN = "0x" + "11" * 20
+USERS = ["0x" + "%02x" % i * 20 for i in range(0x20, 0x40)]
+
+
+@pytest.fixture
+def eth(monkeypatch):
+    eth = FakeEth()
+    patch_web3(monkeypatch, eth)
+    return eth
+
+
+def balance_calls(users):
+    return [
+        Call(TOKEN, ["balanceOf(address)(uint256)", user], [[user, None]])
+        for user in users
+    ]
+
+
+def test_parallel_chunks_keep_order_and_block(eth):
+    def mine_and_stall(requests):
+        # A block lands during every call, and earlier chunks answer last
+        eth.block_number += 1
+        time.sleep(0.02 / requests)
+
+    eth.before_call = mine_and_stall
+    users = USERS[:12]
+    data = Multicall(balance_calls(users), max_calls=2, max_workers=4)()
+    assert list(data.items()) == [(user, balance(user)) for user in users]
+
+    # Every chunk is pinned to the block read before dispatch
+    assert len(eth.requests) == 6
+    assert {block for _, block, _ in eth.requests} == {100}
+
+
+def test_single_chunk_runs_unpinned(eth):
+    Multicall(balance_calls(USERS[:3]), max_workers=4)()
+    assert [block for _, block, _ in eth.requests] == [None]
@@ -0,0 +1,48 @@
+import pytest
+
+from fake_web3 import FakeEth, balance, patch_web3
+from helpers.multicall import CALL_FAILED, Call, Multicall
+
+"""
+  require_success=False isolates failing calls as CALL_FAILED
+"""
+
+TOKEN = "0x" + "11" * 20
+USERS = ["0x" + "%02x" % i * 20 for i in range(0x20, 0x40)]
+
+
+@pytest.fixture
+def eth(monkeypatch):
+    eth = FakeEth()
+    patch_web3(monkeypatch, eth)
+    return eth
+
+
+def balance_calls(users):
+    return [
+        Call(TOKEN, ["balanceOf(address)(uint256)", user], [[user, None]])
+        for user in users
+    ]
+
+
+def test_failed_calls_are_call_failed(eth):
+    calls = balance_calls(USERS[:2]) + [
+        Call(TOKEN, "boom()(uint256)", [["boom", None]]),
+        Call(TOKEN, "empty()(uint256)", [["empty", None]]),
+    ]
+    data = Multicall(calls, require_success=False)()
+
+    assert data[USERS[0]] == balance(USERS[0])
+    assert data[USERS[1]] == balance(USERS[1])
+    # Reverted and empty returns are both the sentinel, not an exception
+    assert data["boom"] is CALL_FAILED
+    assert data["empty"] is CALL_FAILED
+    assert len(eth.requests) == 1
+
+
+def test_failed_call_reverts_plain_aggregate(eth):
+    calls = balance_calls(USERS[:1]) + [
+        Call(TOKEN, "boom()(uint256)", [["boom", None]])
+    ]
+    with pytest.raises(ValueError):
+        Multicall(calls)()
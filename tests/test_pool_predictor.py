@@ -0,0 +1,83 @@
+from dotmap import DotMap
+
+from helpers.pool_predictor import PoolPredictor, get_amount_out
+
+"""
+  predict() must replay balanceOfPool's Solidity math, block by block
+"""
+
+ONE = 10 ** 18
+STATE = DotMap(
+    block=100,
+    amountToken=5 * 10 ** 10,
+    totalSupply=10 ** 13,
+    cash=3 * 10 ** 11,
+    compBal=10 ** 15,
+    borrowBalanceStored=6 * 10 ** 8,
+    compSpeed=10 ** 17,
+    compSupplyBlock=90,
+    compBorrowBlock=95,
+    compAccrued=10 ** 16,
+    accrualBlockNumber=98,
+    totalBorrows=10 ** 11,
+    totalReserves=10 ** 9,
+    borrowIndex=11 * 10 ** 17,
+    reserveFactorMantissa=2 * 10 ** 17,
+    exchangeRateStored=2 * 10 ** 16,
+    borrowRate=10 ** 10,
+    reserves=[(10 ** 24, 10 ** 23), (10 ** 25, 10 ** 10)],
+)
+
+
+def predict_one(state, block):
+    """
+    balanceOfPool written out line by line like MyStrategy
+    """
+    factor = (block - state.accrualBlockNumber) * state.borrowRate
+    interest = factor * state.totalBorrows // ONE
+    totalBorrows = interest + state.totalBorrows
+    totalReserves = state.reserveFactorMantissa * interest // ONE + state.totalReserves
+    borrowIndex = factor * state.borrowIndex // ONE + state.borrowIndex
+    exchangeRate = (
+        (state.cash + totalBorrows - totalReserves) * ONE // state.totalSupply
+    )
+    supplys = exchangeRate * state.amountToken // ONE
+    borrows = state.borrowBalanceStored * borrowIndex // state.borrowIndex
+
+    totalSupply = state.totalSupply * state.exchangeRateStored // ONE
+    shareSupply = (
+        state.amountToken
+        * state.exchangeRateStored
+        // ONE
+        * state.compSpeed
+        // totalSupply
+    )
+    shareBorrow = state.borrowBalanceStored * state.compSpeed // state.totalBorrows
+    comp = (
+        shareSupply * (block - state.compSupplyBlock)
+        + shareBorrow * (block - state.compBorrowBlock)
+        + state.compAccrued
+        + state.compBal
+    )
+    for reserveIn, reserveOut in state.reserves:
+        comp = get_amount_out(comp, reserveIn, reserveOut)
+    return supplys + comp - borrows
+
+
+def test_predict_matches_contract_math():
+    predictor = PoolPredictor(None)
+    blocks = [100, 101, 150, 10_000]
+    predicted = predictor.predict(STATE, blocks)
+    for i, block in enumerate(blocks):
+        assert predicted.balanceOfPool[i] == predict_one(STATE, block)
+    assert predictor.predict(STATE, 150).balanceOfPool == predict_one(STATE, 150)
+
+
+def test_no_position_predicts_zero():
+    state = DotMap(STATE.toDict())
+    state.amountToken = 0
+    state.borrowBalanceStored = 0
+    state.compAccrued = 0
+    state.compBal = 0
+    state.compSpeed = 0
+    assert (PoolPredictor(None).predict(state, [100, 200]).balanceOfPool == 0).all()
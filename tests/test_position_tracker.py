@@ -0,0 +1,62 @@
+import random
+
+from helpers.multicall import CALL_FAILED
+from helpers.position_tracker import (
+    RollingWindow,
+    positions,
+    rolling,
+    threshold_events,
+)
+
+"""
+  The tracker stages run on plain (block, data) pairs, no chain needed
+"""
+
+TARGET = 68 * 10 ** 16
+FACTOR = 75 * 10 ** 16
+
+
+def snap(block, borrows, supplys=10 ** 8):
+    return (
+        block,
+        {
+            "0.supplys": supplys,
+            "0.borrows": borrows,
+            "0.collateralTarget": TARGET,
+            "0.collateralFactor": FACTOR,
+            "0.balanceOfPool": supplys - borrows,
+            "0.compAccrued": block,
+        },
+    )
+
+
+def test_rolling_window_matches_full_recompute():
+    random.seed(7)
+    window = RollingWindow(5)
+    values = [random.randrange(10 ** 20) for _ in range(50)]
+    for i, value in enumerate(values):
+        window.push(value)
+        last = values[max(0, i - 4) : i + 1]
+        stats = window.stats()
+        assert stats.mean == sum(last) // len(last)
+        assert stats.min == min(last) and stats.max == max(last)
+        assert stats.delta == last[-1] - last[0]
+
+
+def test_threshold_events_fire_on_level_changes():
+    borrows = [60, 69, 69, 72, 60] + [None]
+    snaps = [
+        snap(block, borrow * 10 ** 6) if borrow else (block, {"0.supplys": CALL_FAILED})
+        for block, borrow in enumerate(borrows)
+    ]
+    snaps[-1][1].update(
+        {key: CALL_FAILED for key in snap(0, 0)[1] if key != "0.supplys"}
+    )
+    records = list(
+        threshold_events(rolling(positions(iter(snaps), ["strategy"]), window=3))
+    )
+
+    levels = [[event.level for event in record.events] for record in records]
+    assert levels == [[], ["aboveTarget"], [], ["nearCollateralFactor"], ["ok"], []]
+    assert records[2].strategies.strategy.ratio == 69 * 10 ** 16
+    assert records[4].strategies.strategy.rolling.borrows.max == 72 * 10 ** 6
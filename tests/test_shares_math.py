@@ -0,0 +1,64 @@
+import itertools
+import random
+
+from helpers.shares_math import (
+    from_want_to_shares,
+    from_want_to_shares_batch,
+    from_shares_to_want,
+    from_shares_to_want_batch,
+    get_withdrawal_fees_in_shares,
+    get_withdrawal_fees_in_shares_batch,
+    get_report_fees,
+    get_report_fees_batch,
+)
+
+"""
+  Batch shares_math must match the scalar Solidity-floor math bit for bit
+"""
+
+random.seed(1337)
+## WBTC-sized (8 decimals) up to uint256-sized values, to catch any float or int64 path
+AMOUNTS = [1, 9, 10 ** 8 + 7, 123456789123] + [
+    random.randrange(1, 2 ** 200) for _ in range(4)
+]
+SUPPLIES = [10 ** 18, 3 * 10 ** 8 + 1, random.randrange(1, 2 ** 200)]
+
+
+def test_want_shares_batch_matches_scalar():
+    shares = from_want_to_shares_batch(
+        [[amount] for amount in AMOUNTS], SUPPLIES, SUPPLIES[::-1]
+    )
+    for i, amount in enumerate(AMOUNTS):
+        for j, supply in enumerate(SUPPLIES):
+            assert shares[i, j] == from_want_to_shares(
+                amount, supply, SUPPLIES[::-1][j]
+            )
+
+    want = from_shares_to_want_batch(AMOUNTS, 10 ** 18 + 12345, 18)
+    for i, amount in enumerate(AMOUNTS):
+        assert want[i] == from_shares_to_want(amount, 10 ** 18 + 12345, 18)
+
+
+def test_withdrawal_fees_batch_matches_scalar():
+    fees = [0, 10, 50]
+    batch = get_withdrawal_fees_in_shares_batch(
+        [[amount] for amount in AMOUNTS], 10 ** 18 + 1, 18, fees, 10 ** 30, 10 ** 29
+    )
+    for (i, amount), (j, fee) in itertools.product(
+        enumerate(AMOUNTS), enumerate(fees)
+    ):
+        assert batch[i, j] == get_withdrawal_fees_in_shares(
+            amount, 10 ** 18 + 1, 18, fee, 10 ** 30, 10 ** 29
+        )
+
+
+def test_report_fees_batch_matches_scalar():
+    gains = [[amount] for amount in AMOUNTS]
+    times = [0, 3600, 86400 * 7]
+    batch = get_report_fees_batch(gains, 1_000, 1_000, 200, times, 10 ** 18, 10 ** 10)
+    for (i, gain), (j, time) in itertools.product(enumerate(AMOUNTS), enumerate(times)):
+        fees = get_report_fees(gain, 1_000, 1_000, 200, time, 10 ** 18, 10 ** 10)
+        assert batch.shares_perf_treasury[i, j] == fees.shares_perf_treasury
+        assert batch.shares_management[i, j] == fees.shares_management
+        assert batch.shares_perf_strategist[i, j] == fees.shares_perf_strategist
+        assert type(batch.shares_perf_treasury[i, j]) is int
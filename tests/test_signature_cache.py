@@ -0,0 +1,49 @@
+from eth_abi import encode_single
+from eth_utils import function_signature_to_4byte_selector
+
+from helpers.multicall import Call
+from helpers.multicall.call import checksum_address
+from helpers.multicall.signature import get_signature
+
+"""
+  Signatures are parsed once per process and shared by every Call
+"""
+
+TOKEN = "0x" + "11" * 20
+USERS = ["0x" + "%02x" % i * 20 for i in range(0x20, 0x24)]
+
+
+def balance_calls(users):
+    return [
+        Call(TOKEN, ["balanceOf(address)(uint256)", user], [[user, None]])
+        for user in users
+    ]
+
+
+def test_signatures_are_parsed_once():
+    signature = "balanceOf(address)(uint256)"
+    before = get_signature.cache_info()
+    calls = balance_calls(USERS[:3])
+
+    assert all(call.signature is get_signature(signature) for call in calls)
+    after = get_signature.cache_info()
+    assert after.misses - before.misses <= 1
+    assert after.hits - before.hits >= 3
+
+
+def test_cached_signature_encodes_and_decodes():
+    signature = get_signature("balanceOf(address)(uint256)")
+    assert signature.fourbyte == function_signature_to_4byte_selector(
+        "balanceOf(address)"
+    )
+    data = signature.encode_data([USERS[0]])
+    assert data == signature.fourbyte + encode_single("address", USERS[0])
+    assert signature.decode_data(encode_single("uint256", 7)) == (7,)
+
+
+def test_addresses_are_checksummed_once():
+    before = checksum_address.cache_info()
+    balance_calls(USERS)
+    balance_calls(USERS)
+    after = checksum_address.cache_info()
+    assert after.misses - before.misses <= 1
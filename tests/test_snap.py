@@ -0,0 +1,39 @@
+import pickle
+
+from helpers.multicall import CALL_FAILED
+from helpers.snapshot.snap import Snap, SnapSchema
+
+"""
+  Snaps share one interned schema per key set, also once pickled and loaded
+"""
+
+
+def snap(block, supply):
+    return Snap({"sett.totalSupply": supply, "sett.balance": 2 * supply}, block, [])
+
+
+def test_snaps_of_one_key_set_share_a_schema():
+    a, b = snap(1, 10), snap(2, 20)
+    assert a.schema is b.schema
+    assert a.get("sett.balance") == 20 and b.get("sett.balance") == 40
+
+
+def test_pickled_snaps_get_the_shared_schema_back():
+    a = snap(1, 10)
+    a.set("extra.key", 5)
+    loaded = pickle.loads(pickle.dumps(a))
+
+    assert loaded.schema is a.schema
+    assert loaded.schema is SnapSchema.for_keys(["sett.totalSupply", "sett.balance"])
+    assert loaded.data == a.data
+    assert loaded.block == 1 and loaded.extra == {"extra.key": 5}
+    # The pickle carries the keys once, not the schema's index dict
+    assert b"index" not in pickle.dumps(a)
+
+
+def test_failed_lists_call_failed_keys():
+    a = snap(1, 10)
+    assert a.failed() == []
+    a.set("sett.balance", CALL_FAILED)
+    a.set("strategy.balanceOfPool", CALL_FAILED)
+    assert a.failed() == ["sett.balance", "strategy.balanceOfPool"]
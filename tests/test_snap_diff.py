@@ -0,0 +1,82 @@
+import json
+
+from helpers.multicall import CALL_FAILED
+from helpers.snapshot.diff import diff_snaps
+from helpers.snapshot.snap import Snap
+
+"""
+  diff_snaps must find exactly what the old key by key printCompare scan found
+"""
+
+
+def make_snap(block, **overrides):
+    data = {
+        "sett.balance": 10 ** 8,
+        "sett.totalSupply": 10 ** 8,
+        "strategy.isTendable": True,
+        "strategy.getProtectedTokens": ["0xA", "0xB"],
+        "strategy.balanceOfPool": 5 * 10 ** 7,
+        "balances.want.user": 10 ** 6,
+    }
+    data.update(overrides)
+    return Snap(data, block, ["user"])
+
+
+def test_diff_matches_key_scan():
+    before = make_snap(1)
+    after = make_snap(
+        2,
+        **{
+            "sett.balance": 2 * 10 ** 8,
+            "strategy.isTendable": False,
+            "strategy.getProtectedTokens": ["0xA", "0xC"],
+            "strategy.balanceOfPool": CALL_FAILED,
+        }
+    )
+    after.set("extra.metric", 5)
+    changes = diff_snaps(before, after)
+
+    assert changes.rows() == [
+        ("sett.balance", 10 ** 8, 2 * 10 ** 8, 10 ** 8),
+        ("strategy.isTendable", True, False, None),
+        ("strategy.getProtectedTokens", ["0xA", "0xB"], ["0xA", "0xC"], None),
+        ("strategy.balanceOfPool", 5 * 10 ** 7, CALL_FAILED, None),
+        ("extra.metric", None, 5, None),
+    ]
+    decoded = json.loads(changes.to_json())
+    assert decoded["afterBlock"] == 2
+    assert decoded["changes"][3]["after"] == "CallFailed"
+
+
+def test_filters_and_schema_mismatch():
+    before = make_snap(1)
+    after = make_snap(2, **{"sett.balance": 10 ** 8 + 1, "balances.want.user": 2 * 10 ** 6})
+    changes = diff_snaps(before, after)
+    assert [key for key, *_ in changes.filter(threshold=2)] == ["balances.want.user"]
+    assert [key for key, *_ in changes.filter(relativeBps=1)] == ["balances.want.user"]
+    assert [key for key, *_ in changes.filter(keys="^sett")] == ["sett.balance"]
+
+    other = Snap({"sett.balance": 3, "new.key": 1}, 3, [])
+    keys = [key for key, *_ in diff_snaps(before, other)]
+    assert keys == [
+        "sett.balance",
+        "sett.totalSupply",
+        "strategy.isTendable",
+        "strategy.getProtectedTokens",
+        "strategy.balanceOfPool",
+        "balances.want.user",
+        "new.key",
+    ]
+
+
+def test_before_keys_only():
+    # printCompare without filters shows before's keys, like the old scan
+    before = make_snap(1)
+    before.set("extra.before", 1)
+    after = Snap({"sett.balance": 3, "new.key": 1}, 2, [])
+    after.set("extra.before", 2)
+    after.set("extra.after", 1)
+    keys = [key for key, *_ in diff_snaps(before, after).filter(keys=before.has)]
+    assert "new.key" not in keys and "extra.after" not in keys
+    assert keys[0] == "sett.balance" and "extra.before" in keys
+    assert before.has("extra.before") and not before.has("new.key")
@@ -0,0 +1,37 @@
+from helpers.snapshot.history import SnapHistory
+from helpers.snapshot.snap import Snap
+
+"""
+  SnapHistory keeps maxSnaps in memory and spills the rest to a shelve
+"""
+
+
+def snap(block):
+    return Snap({"sett.totalSupply": block * 10}, block, [])
+
+
+def test_least_recently_used_snaps_spill_and_load_back(tmp_path):
+    history = SnapHistory(maxSnaps=2, spillPath=str(tmp_path / "spill"))
+    for block in (1, 2, 3):
+        history[block] = snap(block)
+    assert list(history.memory) == [2, 3]
+
+    # Touching 2 makes 3 the next one out
+    history[2]
+    history[4] = snap(4)
+    assert list(history.memory) == [2, 4]
+    assert history.blocks() == [1, 2, 3, 4] == list(history)
+
+    loaded = history[1]
+    assert loaded.get("sett.totalSupply") == 10
+    assert loaded.schema is snap(1).schema
+    assert 1 in history.memory and len(history.memory) == 2
+    assert history.get(5) is None and 5 not in history
+    history.close()
+
+
+def test_unbounded_history_keeps_everything_in_memory():
+    history = SnapHistory()
+    for block in range(10):
+        history[block] = snap(block)
+    assert len(history.memory) == len(history) == 10
@@ -0,0 +1,99 @@
+import json
+
+from dotmap import DotMap
+
+from helpers.multicall.multicall import STATS
+from helpers.snapshot.metrics import (
+    FIELDS,
+    JsonLinesSink,
+    MemorySink,
+    PrometheusSink,
+    SECONDS_BUCKETS,
+    snap_metrics,
+)
+
+
+def metrics(block, rpcTime):
+    multi = DotMap(stats=dict.fromkeys(STATS, 0))
+    multi.stats.update(calls=40, chunks=2, rpcs=3, rpc_time=rpcTime)
+    return snap_metrics("snap", "StrategySnapshot", block, multi, 0.5, rpcTime + 1)
+
+
+def test_snap_metrics_adds_plan_time_to_encoding():
+    snap = metrics(100, 2.0)
+    assert snap["block"] == 100
+    assert snap["encode_seconds"] == 0.5
+    assert snap["rpc_seconds"] == 2.0
+    assert snap["rpcs"] == 3
+    # Every field carries its unit
+    assert set(FIELDS) <= set(snap)
+    assert "sent_bytes" in snap and "rpc_time" not in snap
+
+
+def test_memory_sink_summary():
+    sink = MemorySink()
+    for i in range(1, 5):
+        sink.emit(metrics(100 + i, float(i)))
+
+    assert len(sink) == 4
+    rpc = sink.summary()[("rpc_seconds", "snap")]
+    assert rpc["count"] == 4
+    assert rpc["sum"] == 10.0
+    assert rpc["max"] == 4.0
+    # 1, 2, 3, 4 fall in the 1, 2.5 and 5 buckets
+    assert rpc["quantiles"][0.5] == 2.5
+    assert 2.5 < rpc["quantiles"][0.9] <= rpc["quantiles"][0.99] <= 4.0
+
+
+def test_memory_sink_is_bounded():
+    sink = MemorySink()
+    for i in range(5000):
+        sink.emit(metrics(100 + i, 0.2))
+
+    assert len(sink) == 5000
+    # One count per bucket, whatever the number of snaps
+    rpc = sink.state()["rpc_seconds"]["snap"]
+    assert len(rpc["counts"]) == len(SECONDS_BUCKETS) + 1
+    assert sum(rpc["counts"]) == 5000
+    assert sink.summary()[("rpc_seconds", "snap")]["quantiles"][0.5] <= 0.25
+
+
+def test_json_lines_and_prometheus_sinks(tmp_path):
+    lines = JsonLinesSink(str(tmp_path / "snaps.jsonl"))
+    prometheus = PrometheusSink(str(tmp_path / "snaps.prom"))
+    for i in range(1, 3):
+        lines.emit(metrics(100 + i, float(i)))
+        prometheus.emit(metrics(100 + i, float(i)))
+
+    rows = [json.loads(line) for line in open(tmp_path / "snaps.jsonl")]
+    assert [row["block"] for row in rows] == [101, 102]
+
+    text = (tmp_path / "snaps.prom").read_text()
+    assert "# TYPE snapshot_rpc_seconds histogram" in text
+    assert 'snapshot_rpc_seconds_bucket{kind="snap",le="1.0"} 1' in text
+    assert 'snapshot_rpc_seconds_bucket{kind="snap",le="2.5"} 2' in text
+    assert 'snapshot_rpc_seconds_bucket{kind="snap",le="+Inf"} 2' in text
+    assert 'snapshot_rpc_seconds_sum{kind="snap"} 3.0' in text
+    assert 'snapshot_calls_count{kind="snap"} 2' in text
+    assert "snapshot_sent_bytes_bucket" in text
+
+    # The file doesn't grow with the number of snaps
+    for i in range(100):
+        prometheus.emit(metrics(103 + i, 1.0))
+    after = (tmp_path / "snaps.prom").read_text()
+    assert len(after.splitlines()) == len(text.splitlines())
+    assert 'snapshot_rpc_seconds_count{kind="snap"} 102' in after
+
+
+def test_memory_sink_merges_worker_state():
+    controller = MemorySink()
+    worker = MemorySink()
+    controller.emit(metrics(101, 1.0))
+    worker.emit(metrics(102, 3.0))
+
+    # Through JSON, like xdist workeroutput
+    controller.merge(json.loads(json.dumps(worker.state())))
+    assert len(controller) == 2
+    rpc = controller.summary()[("rpc_seconds", "snap")]
+    assert rpc["sum"] == 4.0
+    assert rpc["max"] == 3.0
@@ -0,0 +1,67 @@
+import pytest
+
+from helpers.multicall import CALL_FAILED
+from helpers.snapshot.snap import Snap
+from helpers.snapshot.store import SnapStore
+
+"""
+  SnapStore written, reopened from disk and read back through the memmaps
+"""
+
+ADDRESS = "0x" + "ab" * 20
+
+
+def snap(block, **data):
+    return Snap(data, block, ["sett", "strategy"])
+
+
+def test_round_trip_through_a_reopened_store(tmp_path):
+    store = SnapStore(str(tmp_path))
+    store.append(snap(10, supply=2 ** 200 + 7, ok=True, owner=ADDRESS))
+    store.append(snap(11, supply=5, ok=CALL_FAILED, owner=ADDRESS))
+    # A key that shows up later is invalid in the rows before it
+    store.append(snap(13, supply=9, ok=False, owner=ADDRESS, borrows=3))
+
+    store = SnapStore(str(tmp_path))
+    assert store.keys == ["supply", "ok", "owner", "borrows"]
+    blocks, supply = store.series("supply")
+    assert list(blocks) == [10, 11, 13]
+    assert list(supply) == [2 ** 200 + 7, 5, 9]
+    assert list(store.valid("ok")) == [True, False, True]
+    assert list(store.series("ok")[1]) == [1, 0, 0]
+    assert list(store.series("owner")[1]) == [int(ADDRESS, 16)] * 3
+    assert list(store.valid("borrows")) == [False, False, True]
+    assert list(store.series("supply", 11, 13)[1]) == [5, 9]
+
+
+def test_out_of_order_block_is_raised_without_losing_rows(tmp_path):
+    store = SnapStore(str(tmp_path))
+    for block in (10, 11, 12):
+        store.append(snap(block, supply=block))
+
+    with pytest.raises(ValueError):
+        store.append(snap(11, supply=0))
+    assert list(store.blocks()) == [10, 11, 12]
+
+
+def test_rewind_drops_the_reverted_rows(tmp_path):
+    store = SnapStore(str(tmp_path))
+    for block in (10, 11, 12):
+        store.append(snap(block, supply=block))
+
+    store.append(snap(11, supply=100), rewind=True)
+    blocks, supply = store.series("supply")
+    assert list(blocks) == [10, 11]
+    assert list(supply) == [10, 100]
+
+
+def test_negative_values_are_raised_before_writing(tmp_path):
+    store = SnapStore(str(tmp_path))
+    store.append(snap(10, supply=1, change=2))
+
+    with pytest.raises(ValueError):
+        store.append(snap(11, supply=1, change=-2))
+    with pytest.raises(ValueError):
+        store.append(snap(11, supply=2 ** 256, change=0))
+    assert list(store.blocks()) == [10]
+    assert list(store.series("change")[1]) == [2]
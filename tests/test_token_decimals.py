@@ -0,0 +1,76 @@
+import pytest
+
+from helpers.multicall import CALL_FAILED
+from helpers import token_decimals
+from helpers.token_decimals import DEFAULT_DECIMALS, DecimalsRegistry
+
+"""
+  DecimalsRegistry against a fake Multicall answering from a dict
+"""
+
+USDC = "0x04068da6c83afcfa0e13ba15a6696662335d5b75"
+WBTC = "0x321162Cd933E2Be498Cd2267a90534A804051b11"
+BROKEN = "0x" + "ab" * 20
+
+
+class FakeMulticall:
+    # decimals() of every token, CALL_FAILED where it reverts
+    answers = {}
+    # Targets of every multicall made
+    batches = []
+
+    def __init__(self, calls, require_success=True):
+        assert not require_success
+        self.calls = calls
+
+    def __call__(self):
+        self.batches.append([call.target for call in self.calls])
+        data = {}
+        for call in self.calls:
+            ((name, _),) = call.returns
+            data[name] = self.answers[call.target]
+        return data
+
+
+@pytest.fixture
+def multicall(monkeypatch):
+    registry = DecimalsRegistry()
+    FakeMulticall.batches = []
+    FakeMulticall.answers = {
+        registry.key(USDC): 6,
+        registry.key(WBTC): 8,
+        registry.key(BROKEN): CALL_FAILED,
+    }
+    monkeypatch.setattr(token_decimals, "Multicall", FakeMulticall)
+    return FakeMulticall
+
+
+def test_resolve_is_one_batch(multicall):
+    registry = DecimalsRegistry()
+    assert registry.resolve([USDC, WBTC, USDC.upper().replace("0X", "0x")]) == [6, 8, 6]
+    # Every unknown token in one multicall, duplicates and case folded
+    assert len(multicall.batches) == 1
+    assert sorted(multicall.batches[0]) == sorted(
+        [registry.key(USDC), registry.key(WBTC)]
+    )
+
+
+def test_failed_decimals_fall_back_to_18(multicall):
+    registry = DecimalsRegistry()
+    assert registry.resolve([BROKEN, USDC]) == [DEFAULT_DECIMALS, 6]
+    assert registry.get(BROKEN) == 18
+
+
+def test_decimals_are_cached(multicall):
+    registry = DecimalsRegistry()
+    registry.resolve([USDC])
+    assert registry.get(USDC) == 6
+    assert registry.resolve([USDC, WBTC]) == [6, 8]
+    # Only WBTC was still unknown the second time
+    assert [len(batch) for batch in multicall.batches] == [1, 1]
+    assert multicall.batches[1] == [registry.key(WBTC)]
+
+    # set() wins over the chain and costs no call
+    registry.set(BROKEN, 12)
+    assert registry.get(BROKEN) == 12
+    assert len(multicall.batches) == 2
@@ -0,0 +1,68 @@
+import json
+
+from helpers.multicall import CALL_FAILED
+from helpers.snapshot.users import UserSnap
+
+"""
+  UserSnap columns, totals and exports, with a failed read in the middle
+"""
+
+
+def make_user_snap():
+    return UserSnap(
+        ["0x1", "0x2", "0x3"],
+        ["alice", "bob", "0x3"],
+        [10 ** 8, 0, CALL_FAILED],
+        [5 * 10 ** 7, CALL_FAILED, 3],
+        123,
+        2 * 10 ** 18,
+        10 ** 9,
+        18,
+    )
+
+
+def test_user_snap_columns():
+    snap = make_user_snap()
+    assert list(snap.value) == [10 ** 8, CALL_FAILED, 6]
+    assert snap.total("shares") == 5 * 10 ** 7 + 3
+    assert snap.total("want") == 10 ** 8
+    assert snap.user("bob") == {"want": 0, "shares": CALL_FAILED, "value": CALL_FAILED}
+    assert snap.user("0x1")["shares"] == 5 * 10 ** 7
+
+
+def test_user_snap_exports(tmp_path):
+    snap = make_user_snap()
+    decoded = json.loads(snap.to_json())
+    assert decoded["block"] == 123
+    assert decoded["users"][1] == {
+        "key": "bob",
+        "user": "0x2",
+        "want": 0,
+        "shares": None,
+        "value": None,
+    }
+
+    path = tmp_path / "users.csv"
+    snap.to_csv(path)
+    lines = path.read_text().splitlines()
+    assert lines[0] == "key,user,want,shares,value"
+    assert lines[3] == "0x3,0x3,,3,6"
+
+
+def test_failed_ppfs_fails_every_value():
+    snap = UserSnap(
+        ["0x1", "0x2"],
+        ["alice", "bob"],
+        [10 ** 8, 0],
+        [5 * 10 ** 7, 3],
+        123,
+        CALL_FAILED,
+        CALL_FAILED,
+        18,
+    )
+    assert list(snap.value) == [CALL_FAILED, CALL_FAILED]
+    assert snap.total("value") == 0
+    assert snap.total("shares") == 5 * 10 ** 7 + 3
+    decoded = json.loads(snap.to_json())
+    assert decoded["ppfs"] is None and decoded["totalSupply"] is None
+    assert decoded["users"][0]["value"] is None